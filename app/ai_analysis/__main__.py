@@ -10,6 +10,7 @@ _TASKS: dict[str, str] = {
     "daemon": "app.ai_analysis.daemon",
     "document": "app.ai_analysis.document_processor",
     "summary": "app.ai_analysis.daily_summary",
+    "partitions": "app.ai_analysis.partition_maintenance",
 }
 
 
@@ -30,7 +31,7 @@ def main():
     # default to daemon
     task = sys.argv[1] if len(sys.argv) >= 2 else "daemon"
     if task not in _TASKS:
-        print("Usage: python -m app.ai_analysis [daemon|document|summary]")
+        print("Usage: python -m app.ai_analysis [daemon|document|summary|partitions]")
         raise SystemExit(1)
 
     asyncio.run(_run(_TASKS[task]))
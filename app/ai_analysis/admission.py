@@ -0,0 +1,83 @@
+"""Admission control deciding which documents are worth downloading and summarizing."""
+
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Sequence
+
+from app.ai_analysis.extraction import get_extractor
+from app.ai_analysis.file_check import FileCheck
+from app.external_services.external_services import ExternalServices
+from app.metrics import Metrics
+from app.models.models import AnalysisProcessingStatusEnum, Document
+from app.repositories import Repositories
+from app.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentAdmission:
+    """
+    Documents are checked twice: :class:`FileCheck` runs in the bot at ingestion on the file's
+    mime type and size, and :meth:`admit` runs it again on every claimed batch before anything
+    is downloaded, adding the per-chat quota. Rejected documents are released with their final status.
+
+    The quota counts documents claimed for a chat in the last 24 hours. Workers check it
+    independently, so with several of them it may be exceeded by up to a batch per worker.
+    """
+
+    QUOTA_WINDOW = timedelta(days=1)
+
+    def __init__(self, file_check: FileCheck, chat_daily_quota: int = 0):
+        self._file_check = file_check
+        self._chat_daily_quota = chat_daily_quota
+
+    @classmethod
+    def from_settings(cls, cfg: Settings) -> DocumentAdmission:
+        return cls(FileCheck.from_settings(cfg), chat_daily_quota=cfg.DOCUMENT_CHAT_DAILY_QUOTA)
+
+    def check(self, file_type: str | None, file_size: int | None) -> AnalysisProcessingStatusEnum:
+        status = self._file_check.check(file_type, file_size)
+        if status is AnalysisProcessingStatusEnum.NOT_STARTED and get_extractor(file_type) is None:
+            return AnalysisProcessingStatusEnum.UNSUPPORTED
+        return status
+
+    async def admit(self, docs: Sequence[Document], worker_id: str, now: datetime | None = None) -> list[Document]:
+        """Release the *docs* claimed by *worker_id* that may not be processed and return the rest."""
+        if not docs:
+            return []
+        now = now or datetime.utcnow()
+        rejected: dict[AnalysisProcessingStatusEnum, list[Document]] = defaultdict(list)
+        admitted = []
+        for doc in docs:
+            status = self.check(doc.file_type, doc.file_size_bytes)
+            if status is AnalysisProcessingStatusEnum.NOT_STARTED:
+                admitted.append(doc)
+            else:
+                rejected[status].append(doc)
+
+        async with ExternalServices.database.session() as session:
+            if self._chat_daily_quota > 0 and admitted:
+                used = await Repositories.documents.count_claimed_by_chat(
+                    chat_ids={doc.chat_id for doc in admitted if doc.chat_id is not None},
+                    since=now - self.QUOTA_WINDOW,
+                    exclude_ids=[doc.id for doc in docs],
+                    session=session,
+                )
+                within_quota = []
+                for doc in admitted:
+                    if doc.chat_id is not None and used.get(doc.chat_id, 0) >= self._chat_daily_quota:
+                        rejected[AnalysisProcessingStatusEnum.REJECTED].append(doc)
+                        continue
+                    if doc.chat_id is not None:
+                        used[doc.chat_id] = used.get(doc.chat_id, 0) + 1
+                    within_quota.append(doc)
+                admitted = within_quota
+
+            for status, status_docs in rejected.items():
+                logger.info("%s documents rejected as %s", len(status_docs), status.value)
+                Metrics.documents_processed.inc(len(status_docs), outcome=status.value)
+                await Repositories.documents.release_documents(status_docs, status, worker_id, session)
+        return admitted
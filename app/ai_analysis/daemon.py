@@ -2,10 +2,16 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from datetime import datetime, timezone
 
 from app.ai_analysis.document_processor import DocumentProcessor
 from app.ai_analysis.daily_summary import DailySummaryGenerator
+from app.ai_analysis.delivery import DeliveryWorker
+from app.ai_analysis.metrics_collector import DatabaseMetricsCollector
+from app.ai_analysis.partition_maintenance import MessagePartitionMaintainer
+from app.ai_analysis.telegram_sender import TelegramSender
+from app.external_services.external_services import ExternalServices
+from app.metrics import REGISTRY, MetricsServer
+from app.settings import get_settings
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -17,24 +23,58 @@ async def _document_loop(processor: DocumentProcessor):
 
 
 async def _summary_loop(generator: DailySummaryGenerator):
-    """Check once per minute which chats need a digest and send it."""
-    while True:
-        now = datetime.utcnow().replace(tzinfo=timezone.utc)
-        await generator.run_once(now)
-        await asyncio.sleep(60)
+    """Send digests as their scheduled time comes."""
+    await generator.run_forever()
+
+
+async def _delivery_loop(worker: DeliveryWorker):
+    """Send digests and other queued bot messages from the outbox."""
+    await worker.run_forever()
+
+
+async def _partial_summary_loop(generator: DailySummaryGenerator):
+    """Condense new messages into partial summaries throughout the day."""
+    await generator.condense_forever()
+
+
+async def _partition_loop(maintainer: MessagePartitionMaintainer):
+    """Keep partitions of the messages table ahead of the calendar."""
+    await maintainer.run_forever()
+
+
+async def _metrics_loop(collector: DatabaseMetricsCollector):
+    """Refresh the gauges read from the database."""
+    await collector.run_forever()
 
 
 async def run() -> None:  # noqa: D401  # Same signature as other modules
     from app.bot.bot import BOT  # Deferred import to avoid circular deps
 
+    cfg = get_settings()
+    delivery_worker = DeliveryWorker.from_settings(TelegramSender.from_settings(BOT, cfg), cfg)
     processor = DocumentProcessor(BOT)
-    generator = DailySummaryGenerator(BOT)
+    generator = DailySummaryGenerator()
+    maintainer = MessagePartitionMaintainer()
+    metrics_server = MetricsServer(REGISTRY, host=cfg.METRICS_HOST, port=cfg.METRICS_DAEMON_PORT)
 
-    await asyncio.gather(
+    loops = [
         _document_loop(processor),
         _summary_loop(generator),
-        return_exceptions=False,
-    )
+        _delivery_loop(delivery_worker),
+        _partition_loop(maintainer),
+        _metrics_loop(DatabaseMetricsCollector()),
+    ]
+    if generator.incremental:
+        loops.append(_partial_summary_loop(generator))
+
+    await ExternalServices.start()
+    await metrics_server.start()
+    try:
+        await asyncio.gather(*loops, return_exceptions=False)
+    finally:
+        await metrics_server.stop()
+        # Closes the pooled connections of the database engine and the shared LLM client
+        await ExternalServices.stop()
 
 
 # for manual testing: `python -m app.ai_analysis.daemon`
@@ -1,111 +1,226 @@
-from __future__ import annotations
-
 """Scheduler task that generates daily summaries for chats at configured times."""
 
+from __future__ import annotations
+
 import asyncio
 import logging
 from datetime import datetime, timedelta
 from typing import Sequence
 
-from aiogram import Bot
-from aiogram.exceptions import TelegramBadRequest
-from sched import scheduler
-import time as time_mod
-
+from app.ai_analysis.delivery import DeliveryWorker
+from app.ai_analysis.summarization import MapReduceSummarizer, TokenCounter, context_tokens_for_model
+from app.ai_analysis.telegram_sender import TelegramSender
 from app.external_services.external_services import ExternalServices
+from app.metrics import Metrics
+from app.models.models import Message, Summary
 from app.repositories import Repositories
 from app.settings import get_settings
-from openai import AsyncOpenAI
 
 logger = logging.getLogger(__name__)
 
 
-
 class DailySummaryGenerator:
     MAX_TOKENS = 1500
-
-    def __init__(self, bot: Bot):
-        self._bot = bot
+    SYSTEM_PROMPT = (
+        "You are a helpful assistant that writes daily chat digests. "
+        "Return concise plain-text summary (no markdown). Make it structured. "
+        "Don't forget to greet users in chat with a friendly 'Hello' or 'Hi'. "
+        "Introduce the message topic and highlight the main points. "
+    )
+
+    def __init__(self):
         self._cfg = get_settings()
-        self.openai = AsyncOpenAI(api_key=self._cfg.OPENAI_API_KEY)
+        self._chats_semaphore = asyncio.Semaphore(self._cfg.SUMMARY_CONCURRENCY)
+        self._summarizer = MapReduceSummarizer(
+            complete=self._complete,
+            counter=TokenCounter(self._cfg.OPENAI_MODEL),
+            context_tokens=self._cfg.OPENAI_MODEL_CONTEXT_TOKENS or context_tokens_for_model(self._cfg.OPENAI_MODEL),
+            map_max_tokens=self._cfg.SUMMARY_CHUNK_MAX_TOKENS,
+            concurrency=self._cfg.SUMMARY_MAP_CONCURRENCY,
+        )
+
+    @property
+    def incremental(self) -> bool:
+        return self._cfg.SUMMARY_INCREMENTAL
+
+    async def _complete(self, system_prompt: str, body: str, max_tokens: int) -> str:
+        return await ExternalServices.llm.complete(system_prompt, body, max_tokens)
 
     async def _generate_summary_content(
         self, messages: Sequence[str], docs: Sequence[str]
     ) -> str:
-        body = "\n".join(messages + docs)
-        resp = await self.openai.chat.completions.create(
-            model=self._cfg.OPENAI_MODEL,
-            max_tokens=self.MAX_TOKENS,
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a helpful assistant that writes daily chat digests. "
-                        "Return concise plain-text summary (no markdown). Make it structured. "
-                        "Don't forget to greet users in chat with a friendly 'Hello' or 'Hi'. "
-                        "Introduce the message topic and highlight the main points. "
-                    ),
-                },
-                {"role": "user", "content": body},
-            ],
+        return await self._summarizer.summarize(
+            list(messages) + list(docs), self.SYSTEM_PROMPT, self.MAX_TOKENS
         )
-        return resp.choices[0].message.content.strip()
 
     async def _collect_data(self, chat_id: int, now: datetime):
         since = now - timedelta(hours=24)
         since = since.replace(tzinfo=None)
-        async with ExternalServices.database.session() as session:
-            msgs = await Repositories.chats.get_messages_between(chat_id, since, now, session)
+        async with ExternalServices.database.session(read_only=True) as session:
+            partials: Sequence[Summary] = []
+            if self._cfg.SUMMARY_INCREMENTAL:
+                partials = await Repositories.summaries.get_partial_summaries_between(
+                    chat_id, since, now, session
+                )
+            msgs: Sequence[Message]
+            if partials:
+                # Only messages that are not condensed into partial summaries yet; windows are
+                # half-open, so a message sent exactly at a boundary is in exactly one of them
+                msgs = [
+                    *await Repositories.chats.get_messages_between(
+                        chat_id, since, partials[0].messages_since_time, session
+                    ),
+                    *await Repositories.chats.get_messages_between(
+                        chat_id, partials[-1].messages_until_time, now, session
+                    ),
+                ]
+            else:
+                msgs = await Repositories.chats.get_messages_between(chat_id, since, now, session)
             docs = await Repositories.chats.get_documents_summaries_between(
                 chat_id, since, now, session
             )
-        messages_text = [m.message_text or "" for m in msgs if m.message_text]
+        messages_text = [p.summary_content for p in partials]
+        messages_text += [m.message_text or "" for m in msgs if m.message_text]
         return messages_text, docs, since
 
-    async def _save_and_send(
+    async def _save(
         self, chat_id: int, summary: str, since: datetime, until: datetime
     ) -> None:
+        """Store the digest together with its outbox entry; the delivery worker sends it."""
         async with ExternalServices.database.session() as session:
             await Repositories.summaries.save_summary(
                 chat_id, summary, since, until, session
             )
-            await session.commit()
+            # Same transaction, so a saved digest is never generated again
+            await Repositories.chats.advance_summary_schedule(chat_id, until, session)
+        Metrics.digests.inc(outcome="generated")
 
-        try:
-            await self._bot.send_message(chat_id, summary)
-        except TelegramBadRequest as exc:
-            logger.warning("Failed to send summary to %s: %s", chat_id, exc)
+    async def _skip(self, chat_id: int, due_at: datetime) -> None:
+        async with ExternalServices.database.session() as session:
+            await Repositories.chats.advance_summary_schedule(chat_id, due_at, session)
 
-    async def run_once(self, now: datetime | None = None):
-        now = now or datetime.now()
+    async def run_once(self, now: datetime | None = None) -> int:
+        """Send every digest that is due at *now*; returns the number of chats claimed."""
+        now = now or datetime.utcnow()
         # ensure naive datetime for DB comparisons
         if now.tzinfo is not None:
             now = now.replace(tzinfo=None)
         async with ExternalServices.database.session() as session:
-            chat_ids = await Repositories.chats.get_chats_due_for_summary(now, session)
-        print(now, chat_ids)
-
-        for chat_id in chat_ids:
-            msgs, docs, since = await self._collect_data(chat_id, now)
-            if not msgs and not docs:
-                continue
-            summary = await self._generate_summary_content(msgs, docs)
-            await self._save_and_send(chat_id, summary, since, now)
-
-
-async def scheduled_runner():
-    from app.bot.bot import BOT
-
-    generator = DailySummaryGenerator(BOT)
-
-    sched = scheduler(time_mod.time, time_mod.sleep)
+            due_chats = await Repositories.chats.claim_due_chats(
+                now,
+                lease=timedelta(seconds=self._cfg.SUMMARY_LEASE_SEC),
+                limit=self._cfg.SUMMARY_CLAIM_BATCH_SIZE,
+                max_attempts=self._cfg.SUMMARY_MAX_ATTEMPTS,
+                session=session,
+            )
+        if due_chats:
+            logger.info("Generating digests for %s chats", len(due_chats))
+
+        await asyncio.gather(*(self._process_chat(chat_id, due_at) for chat_id, due_at in due_chats))
+        return len(due_chats)
+
+    async def _process_chat(self, chat_id: int, due_at: datetime) -> None:
+        """
+        Build and deliver one chat's digest; failures are logged and don't affect other chats.
+        A failed chat keeps its lease and is retried once the lease expires, at most
+        ``SUMMARY_MAX_ATTEMPTS`` times in all.
+        """
+        async with self._chats_semaphore:
+            try:
+                msgs, docs, since = await self._collect_data(chat_id, due_at)
+                if not msgs and not docs:
+                    await self._skip(chat_id, due_at)
+                    Metrics.digests.inc(outcome="skipped")
+                    return
+                summary = await self._generate_summary_content(msgs, docs)
+                await self._save(chat_id, summary, since, due_at)
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.exception("Failed to generate summary for chat %s: %s", chat_id, exc)
+                Metrics.digests.inc(outcome="failed")
+
+    async def run_forever(self) -> None:
+        """Sleep until the earliest scheduled digest, send everything due and repeat."""
+        max_sleep = self._cfg.SUMMARY_SCHEDULER_MAX_SLEEP_SEC
+        while True:
+            try:
+                claimed = await self.run_once()
+                if claimed >= self._cfg.SUMMARY_CLAIM_BATCH_SIZE:
+                    continue
+                async with ExternalServices.database.session(autocommit=True) as session:
+                    next_at = await Repositories.chats.get_next_summary_at(datetime.utcnow(), session)
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.exception("Summary scheduler iteration failed: %s", exc)
+                next_at = None
+
+            delay = max_sleep
+            if next_at is not None:
+                delay = min(max((next_at - datetime.utcnow()).total_seconds(), 1.0), max_sleep)
+            await asyncio.sleep(delay)
+
+    async def _condense_chat(self, chat_id: int, lookback_start: datetime, window_end: datetime) -> None:
+        async with self._chats_semaphore:
+            try:
+                async with ExternalServices.database.session(read_only=True) as session:
+                    last_until = await Repositories.summaries.get_last_partial_until(chat_id, session)
+                    since = max(last_until or lookback_start, lookback_start)
+                    if since >= window_end:
+                        return
+                    msgs = await Repositories.chats.get_messages_between(chat_id, since, window_end, session)
+                texts = [m.message_text for m in msgs if m.message_text]
+                if not texts:
+                    return
+                content = await self._summarizer.summarize(
+                    texts, self._summarizer.MAP_PROMPT, self._cfg.SUMMARY_CHUNK_MAX_TOKENS
+                )
+                async with ExternalServices.database.session() as session:
+                    await Repositories.summaries.save_partial_summary(
+                        chat_id, content, since, window_end, session
+                    )
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.exception("Failed to condense messages of chat %s: %s", chat_id, exc)
+
+    def _partial_window_end(self, now: datetime) -> datetime:
+        interval = timedelta(seconds=self._cfg.SUMMARY_PARTIAL_INTERVAL_SEC)
+        return datetime.min + (now - datetime.min) // interval * interval
+
+    async def condense_once(self, now: datetime | None = None) -> None:
+        """
+        Condense messages of the last completed interval(s) into partial summaries,
+        so the daily digest only has to merge them.
+        """
+        now = now or datetime.utcnow()
+        if now.tzinfo is not None:
+            now = now.replace(tzinfo=None)
+        window_end = self._partial_window_end(now)
+        lookback_start = window_end - timedelta(hours=24)
+        async with ExternalServices.database.session(autocommit=True) as session:
+            chat_ids = await Repositories.chats.get_chats_with_messages_between(
+                lookback_start, window_end, session
+            )
+        await asyncio.gather(
+            *(self._condense_chat(chat_id, lookback_start, window_end) for chat_id in chat_ids)
+        )
 
-    async def tick():
+    async def condense_forever(self) -> None:
+        interval = timedelta(seconds=self._cfg.SUMMARY_PARTIAL_INTERVAL_SEC)
         while True:
-            now = datetime.now()
-            await generator.run_once(now)
-            await asyncio.sleep(60)  # run every minute
+            try:
+                await self.condense_once()
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.exception("Partial summaries iteration failed: %s", exc)
+            next_window = self._partial_window_end(datetime.utcnow()) + interval
+            await asyncio.sleep(max((next_window - datetime.utcnow()).total_seconds(), 1.0))
 
-    asyncio.create_task(tick())
 
-    sched.run()
+async def scheduled_runner():
+    from app.bot.bot import BOT  # Deferred import to avoid circular deps
+
+    cfg = get_settings()
+    generator = DailySummaryGenerator()
+    # Digests are only put into the outbox, something has to send them
+    delivery_worker = DeliveryWorker.from_settings(TelegramSender.from_settings(BOT, cfg), cfg)
+    await ExternalServices.start()
+    try:
+        await asyncio.gather(generator.run_forever(), delivery_worker.run_forever())
+    finally:
+        await ExternalServices.stop()
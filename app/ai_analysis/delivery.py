@@ -0,0 +1,150 @@
+"""Delivery worker that drains the ``outgoing_messages`` outbox to Telegram."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from contextlib import suppress
+from datetime import datetime, timedelta
+
+from app.ai_analysis.telegram_sender import TelegramSender
+from app.external_services.external_services import ExternalServices
+from app.metrics import Metrics
+from app.models.models import DeliveryStatusEnum, OutgoingMessage
+from app.repositories import Repositories
+from app.repositories.outgoing_messages import OUTGOING_MESSAGES_QUEUED_CHANNEL
+from app.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryWorker:
+    """
+    Sends pending ``outgoing_messages`` in batches. Rows are written in the same transaction
+    as what they deliver (e.g. a digest), so nothing saved is lost when a send or the process
+    fails, and the LLM stage never waits for Telegram.
+
+    Claimed rows are leased, so several workers can drain the outbox at once and a row whose
+    worker died is picked up again. Status updates only apply to rows still under the claim that
+    returned them, so a worker that outlived its lease can't overwrite the progress of the
+    worker that re-claimed the row. A crash between the send and the status update, or a
+    lease running out mid-send, delivers the message again: delivery is at least once.
+    """
+
+    def __init__(
+        self,
+        sender: TelegramSender,
+        batch_size: int = 100,
+        max_attempts: int = 10,
+        lease: timedelta = timedelta(minutes=5),
+        retry_base_delay_sec: float = 30,
+        poll_interval_sec: float = 10,
+    ):
+        self._sender = sender
+        self._batch_size = batch_size
+        self._max_attempts = max_attempts
+        self._lease = lease
+        self._retry_base_delay_sec = retry_base_delay_sec
+        self._poll_interval_sec = poll_interval_sec
+        self._messages_queued = asyncio.Event()
+        self._listen_connection = None
+
+    @classmethod
+    def from_settings(cls, sender: TelegramSender, cfg: Settings) -> DeliveryWorker:
+        return cls(
+            sender,
+            batch_size=cfg.OUTBOX_BATCH_SIZE,
+            max_attempts=cfg.OUTBOX_MAX_ATTEMPTS,
+            lease=timedelta(seconds=cfg.OUTBOX_LEASE_SEC),
+            retry_base_delay_sec=cfg.OUTBOX_RETRY_BASE_DELAY_SEC,
+            poll_interval_sec=cfg.OUTBOX_POLL_INTERVAL_SEC,
+        )
+
+    def _backoff_sec(self, attempt: int) -> float:
+        return self._retry_base_delay_sec * 2 ** (attempt - 1) * random.uniform(0.5, 1.0)
+
+    async def _deliver(self, message: OutgoingMessage, deadline: float) -> None:
+        result = await self._sender.deliver(message.chat_id, message.text, message.parts_sent, deadline)
+        async with ExternalServices.database.session() as session:
+            if result.migrated_to_chat_id is not None:
+                # Later messages and digests go to the new id right away
+                await Repositories.chats.migrate_chat(message.chat_id, result.migrated_to_chat_id, session)
+                await Repositories.outgoing_messages.move_to_chat(
+                    message.chat_id, result.migrated_to_chat_id, session
+                )
+            if result.status is DeliveryStatusEnum.SENT:
+                await Repositories.outgoing_messages.mark_sent(message, session)
+            elif result.status is DeliveryStatusEnum.FAILED:
+                await Repositories.outgoing_messages.mark_failed(message, result.error, session)
+            else:
+                delay = max(result.retry_in_sec, self._backoff_sec(message.attempts))
+                await Repositories.outgoing_messages.reschedule(
+                    message, datetime.utcnow() + timedelta(seconds=delay), result.error, result.parts_sent, session
+                )
+        if message.summary_id is None or result.status is DeliveryStatusEnum.PENDING:
+            return
+        if result.status is DeliveryStatusEnum.FAILED:
+            Metrics.digests.inc(outcome="undelivered")
+            return
+        Metrics.digests.inc(outcome="sent")
+        if message.scheduled_at is not None:
+            Metrics.digest_lag_seconds.observe((datetime.utcnow() - message.scheduled_at).total_seconds())
+
+    async def deliver_once(self) -> int:
+        """Send one batch of due messages; returns how many were claimed."""
+        async with ExternalServices.database.session() as session:
+            messages = await Repositories.outgoing_messages.claim_due(
+                datetime.utcnow(), self._lease, self._batch_size, self._max_attempts, session
+            )
+        if messages:
+            logger.info("Delivering %s queued messages", len(messages))
+        # Sends stop well inside the lease, so no other worker re-claims a message meanwhile.
+        # What is left (e.g. behind a long flood wait) goes back to the outbox.
+        deadline = time.monotonic() + self._lease.total_seconds() / 2
+        # Rate limits and the order within a chat are kept by the sender
+        await asyncio.gather(*(self._deliver(message, deadline) for message in messages))
+        return len(messages)
+
+    async def _listen(self) -> bool:
+        """Make sure the LISTEN connection is open; returns False when notifications are unavailable."""
+        if self._listen_connection is not None and not self._listen_connection.is_closed():
+            return True
+        try:
+            self._listen_connection = await ExternalServices.database.listen(
+                OUTGOING_MESSAGES_QUEUED_CHANNEL, lambda _payload: self._messages_queued.set()
+            )
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("Cannot LISTEN for queued messages, falling back to polling: %s", exc)
+            self._listen_connection = None
+            return False
+        return True
+
+    async def _unlisten(self) -> None:
+        if self._listen_connection is not None:
+            with suppress(Exception):
+                await self._listen_connection.close()
+            self._listen_connection = None
+
+    async def _wait_for_messages(self) -> None:
+        """
+        Sleep until a message is queued, or at most ``poll_interval_sec``:
+        retries become due without a notification, and LISTEN may be unavailable.
+        """
+        await self._listen()
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._messages_queued.wait(), self._poll_interval_sec)
+
+    async def run_forever(self) -> None:
+        try:
+            while True:
+                self._messages_queued.clear()
+                try:
+                    if await self.deliver_once() >= self._batch_size:
+                        continue
+                except Exception as exc:  # pylint: disable=broad-except
+                    logger.exception("Delivering queued messages failed: %s", exc)
+                await self._wait_for_messages()
+        finally:
+            await self._unlisten()
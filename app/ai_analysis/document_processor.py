@@ -1,56 +1,169 @@
 from __future__ import annotations
 
-import fitz
-
 import asyncio
 import logging
-from io import BytesIO
+import os
+import socket
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import suppress
+from datetime import timedelta
 from typing import Sequence
+from uuid import UUID
 
-import openai
 from aiogram import Bot
 from aiogram.exceptions import TelegramBadRequest
 
+from app.ai_analysis.admission import DocumentAdmission
+from app.ai_analysis.extraction import extract_text, file_sha256
 from app.external_services.external_services import ExternalServices
+from app.metrics import Metrics
 from app.models.models import Document
 from app.repositories import Repositories
+from app.repositories.documents import DOCUMENTS_QUEUED_CHANNEL
+from app.services.cache import LRUCache
 from app.settings import get_settings
 
 logger = logging.getLogger(__name__)
 
 
 class DocumentProcessor:
+    """
+    Downloads documents, extracts their text and stores an AI summary for each one.
+    Claimed documents go through :class:`DocumentAdmission` first, so files that are too
+    large, of an unsupported type or over the chat's quota are never downloaded.
+
+    :meth:`run_once` handles a single batch. :meth:`run_forever` runs a pipeline of
+    downloader, extractor and summarizer workers connected with bounded queues; text
+    extraction happens in a process pool so it doesn't block the event loop.
+
+    Leases of claimed documents are renewed while they are in the pipeline. A document whose
+    lease was lost anyway (e.g. the database was unreachable for a while) is dropped before
+    its next download or LLM call, and its result is discarded, since another worker owns it.
+    """
+
     BATCH_SIZE = 3
     SUMMARY_TOKEN_LIMIT = 200
 
     def __init__(self, bot: Bot):
         self._bot = bot
         self._cfg = get_settings()
-        self.openai = openai.AsyncOpenAI(api_key=self._cfg.OPENAI_API_KEY)
+        self._executor: ProcessPoolExecutor | None = None
+        self.worker_id = self._cfg.DOCUMENT_WORKER_ID or f"{socket.gethostname()}:{os.getpid()}"
+        self._documents_queued = asyncio.Event()
+        # In-process layer over the document_summary_cache table
+        self._summary_cache: LRUCache[str, str] = LRUCache(max_size=self._cfg.DOCUMENT_SUMMARY_CACHE_SIZE)
+        self._listen_connection = None
+        self._admission = DocumentAdmission.from_settings(self._cfg)
+        self._lease = timedelta(seconds=self._cfg.DOCUMENT_LEASE_SEC)
+        # Claimed documents that are still in the pipeline, by id
+        self._leased: dict[UUID, Document] = {}
+        self._download_slot_freed = asyncio.Event()
 
-    async def _download_document(self, telegram_file_id: str) -> str | None:
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self._cfg.DOCUMENT_EXTRACT_PROCESSES)
+        return self._executor
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    async def _listen(self) -> bool:
+        """Make sure the LISTEN connection is open; returns False when notifications are unavailable."""
+        if self._listen_connection is not None and not self._listen_connection.is_closed():
+            return True
+        try:
+            self._listen_connection = await ExternalServices.database.listen(
+                DOCUMENTS_QUEUED_CHANNEL, lambda _payload: self._documents_queued.set()
+            )
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("Cannot LISTEN for new documents, falling back to polling: %s", exc)
+            self._listen_connection = None
+            return False
+        return True
+
+    async def _unlisten(self) -> None:
+        if self._listen_connection is not None:
+            with suppress(Exception):
+                await self._listen_connection.close()
+            self._listen_connection = None
+
+    async def _wait_for_documents(self, poll_interval: float) -> None:
+        """Sleep until a document is queued, or at most until the next fallback poll."""
+        if await self._listen():
+            poll_interval = self._cfg.DOCUMENT_NOTIFY_FALLBACK_POLL_SEC
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._documents_queued.wait(), poll_interval)
+
+    async def _download(self, telegram_file_id: str) -> str | None:
+        """Spool the file to a temporary file and return its path; the caller removes it."""
+        fd, path = tempfile.mkstemp(prefix="document-", dir=self._cfg.DOCUMENT_SPOOL_DIR or None)
+        os.close(fd)
         try:
             file = await self._bot.get_file(telegram_file_id)
-            bio = BytesIO()
-            await self._bot.download_file(file.file_path, destination=bio)
-            bio.seek(0)
-
-            # Parse PDF
-            with fitz.open(stream=bio.read(), filetype="pdf") as doc:
-                text = ""
-                for page in doc:
-                    text += page.get_text()
-            return text.strip()
+            await self._bot.download_file(file.file_path, destination=path)
+            return path
         except TelegramBadRequest as exc:
             logger.warning("Failed to download file %s: %s", telegram_file_id, exc)
+            self._remove(path)
             return None
+        except BaseException:
+            self._remove(path)
+            raise
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        with suppress(FileNotFoundError):
+            os.unlink(path)
+
+    async def _extract_text(self, path: str, file_type: str) -> str | None:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self._get_executor(),
+                extract_text,
+                path,
+                file_type,
+                self._cfg.DOCUMENT_MAX_PAGES,
+                self._cfg.DOCUMENT_MAX_CHARS,
+            )
         except Exception as e:
-            logger.warning("Failed to extract text from PDF: %s", e)
+            logger.warning("Failed to extract text from %s document: %s", file_type, e)
             return None
 
+    @staticmethod
+    def _file_cache_keys(doc: Document) -> list[str]:
+        return [f"file:{doc.telegram_file_unique_id}"] if doc.telegram_file_unique_id else []
+
+    @staticmethod
+    async def _content_cache_key(path: str) -> str:
+        return f"sha256:{await asyncio.to_thread(file_sha256, path)}"
+
+    async def _get_cached_summary(self, cache_keys: Sequence[str]) -> str | None:
+        for key in cache_keys:
+            if (summary := self._summary_cache.get(key)) is not None:
+                return summary
+        if not cache_keys:
+            return None
+        async with ExternalServices.database.session(autocommit=True) as session:
+            summary = await Repositories.documents.get_cached_summary(cache_keys, session)
+        if summary is not None:
+            for key in cache_keys:
+                self._summary_cache.set(key, summary)
+        return summary
+
+    async def _save_from_cache(self, doc: Document, cache_keys: Sequence[str]) -> bool:
+        """Mark *doc* analyzed if a file with one of *cache_keys* was summarized before."""
+        summary = await self._get_cached_summary(cache_keys)
+        if summary is None:
+            return False
+        await self._save_summary(doc, summary, [*self._file_cache_keys(doc), *cache_keys], outcome="cached")
+        return True
+
     async def _summarize(self, text: str) -> str:
-        resp = await self.openai.chat.completions.create(
-            model=self._cfg.OPENAI_MODEL,
+        return await ExternalServices.llm.chat(
             max_tokens=self.SUMMARY_TOKEN_LIMIT,
             messages=[
                 {
@@ -70,52 +183,217 @@ class DocumentProcessor:
                 },
             ],
         )
-        return resp.choices[0].message.content.strip()
 
-    async def _process_batch(self, docs: Sequence[Document]) -> None:
+    async def _save_summary(
+        self, doc: Document, summary: str, cache_keys: Sequence[str] = (), outcome: str = "analyzed"
+    ) -> None:
+        self._leased.pop(doc.id, None)
+        cache_keys = list(dict.fromkeys(cache_keys))
+        async with ExternalServices.database.session() as session:
+            saved = await Repositories.documents.save_summary(doc, summary, self.worker_id, session)
+            # The summary is right whoever owns the document now, so it is cached anyway
+            await Repositories.documents.save_cached_summary(cache_keys, summary, session)
+        for key in cache_keys:
+            self._summary_cache.set(key, summary)
+        if not saved:
+            logger.warning("Lease on document %s was lost, its summary is left to the new owner", doc.id)
+            outcome = "lease_lost"
+        Metrics.documents_processed.inc(outcome=outcome)
+
+    async def _mark_error(self, doc: Document) -> None:
+        self._leased.pop(doc.id, None)
         async with ExternalServices.database.session() as session:
-            # Mark as pending early to avoid duplicate processing
-            await Repositories.documents.mark_pending(docs, session)
-            await session.commit()
+            await Repositories.documents.mark_error(doc, self.worker_id, session)
+        Metrics.documents_processed.inc(outcome="error")
 
+    async def _claim(self, batch_size: int) -> list[Document]:
+        """Claim up to *batch_size* documents and return those that pass admission control."""
+        async with ExternalServices.database.session() as session:
+            docs = await Repositories.documents.claim_documents(
+                worker_id=self.worker_id,
+                batch_size=batch_size,
+                lease=self._lease,
+                max_attempts=self._cfg.DOCUMENT_MAX_ATTEMPTS,
+                session=session,
+            )
+        admitted = await self._admission.admit(docs, self.worker_id)
+        for doc in admitted:
+            self._leased[doc.id] = doc
+        return admitted
+
+    def _owns(self, doc: Document) -> bool:
+        """False once the lease on *doc* was lost; the document is then left to whoever claimed it."""
+        if doc.id in self._leased:
+            return True
+        logger.warning("Lease on document %s was lost, dropping it", doc.id)
+        Metrics.documents_processed.inc(outcome="lease_lost")
+        return False
+
+    async def _renew_leases(self) -> None:
+        docs = list(self._leased.values())
+        if not docs:
+            return
+        async with ExternalServices.database.session() as session:
+            renewed = await Repositories.documents.renew_leases(docs, self.worker_id, self._lease, session)
         for doc in docs:
-            try:
-                file_bytes = await self._download_document(doc.telegram_file_id)
-                if file_bytes is None:
-                    async with ExternalServices.database.session() as session:
-                        await Repositories.documents.mark_error(doc, session)
-                        await session.commit()
-                    continue
+            if doc.id not in renewed:
+                self._leased.pop(doc.id, None)
 
-                summary = await self._summarize(file_bytes)
-                async with ExternalServices.database.session() as session:
-                    await Repositories.documents.save_summary(doc, summary, session)
-                    await session.commit()
+    async def _renew_leases_forever(self) -> None:
+        """Keep leases of documents waiting in queues, LLM retries and rate limits from running out."""
+        while True:
+            await asyncio.sleep(self._lease.total_seconds() / 3)
+            try:
+                await self._renew_leases()
             except Exception as exc:  # pylint: disable=broad-except
-                logger.exception("Error processing document %s: %s", doc.id, exc)
-                async with ExternalServices.database.session() as session:
-                    await Repositories.documents.mark_error(doc, session)
-                    await session.commit()
+                logger.exception("Failed to renew document leases: %s", exc)
 
-    async def run_once(self) -> None:
-        async with ExternalServices.database.session() as session:
-            docs = await Repositories.documents.get_unprocessed_documents(
-                batch_size=self.BATCH_SIZE, session=session
-            )
+    async def _process_document(self, doc: Document) -> None:
+        try:
+            if await self._save_from_cache(doc, self._file_cache_keys(doc)):
+                return
+            path = await self._download(doc.telegram_file_id)
+            if path is None:
+                await self._mark_error(doc)
+                return
+            try:
+                content_key = await self._content_cache_key(path)
+                if await self._save_from_cache(doc, [content_key]):
+                    return
+                text = await self._extract_text(path, doc.file_type)
+            finally:
+                self._remove(path)
+            if text is None:
+                await self._mark_error(doc)
+                return
+            if not self._owns(doc):
+                return
 
+            summary = await self._summarize(text)
+            await self._save_summary(doc, summary, [*self._file_cache_keys(doc), content_key])
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.exception("Error processing document %s: %s", doc.id, exc)
+            await self._mark_error(doc)
+
+    async def run_once(self) -> None:
+        docs = await self._claim(self.BATCH_SIZE)
         if not docs:
             return
 
-        await self._process_batch(docs)
+        renewer = asyncio.create_task(self._renew_leases_forever())
+        try:
+            await asyncio.gather(*(self._process_document(doc) for doc in docs))
+        finally:
+            renewer.cancel()
+
+    async def _feed(self, downloads: asyncio.Queue, poll_interval: float) -> None:
+        """
+        Claim new documents whenever the download queue has room for them. Nothing is claimed
+        while it is full, so leases don't run down before the pipeline even starts on a document.
+        """
+        while True:
+            # Cleared before checking so a notification or a freed slot meanwhile isn't lost
+            self._documents_queued.clear()
+            self._download_slot_freed.clear()
+            free_slots = downloads.maxsize - downloads.qsize()
+            if free_slots <= 0:
+                await self._download_slot_freed.wait()
+                continue
+            claimed = await self._claim(free_slots)
+            if not claimed:
+                await self._wait_for_documents(poll_interval)
+                continue
+            # Only the feeder puts into the queue, so the room checked above is still there
+            for doc in claimed:
+                downloads.put_nowait(doc)
+
+    async def _download_worker(self, downloads: asyncio.Queue, extractions: asyncio.Queue) -> None:
+        while True:
+            doc = await downloads.get()
+            self._download_slot_freed.set()
+            try:
+                if not self._owns(doc):
+                    continue
+                # Files analyzed before in any chat need no download at all
+                if await self._save_from_cache(doc, self._file_cache_keys(doc)):
+                    continue
+                path = await self._download(doc.telegram_file_id)
+                if path is None:
+                    await self._mark_error(doc)
+                    continue
+                try:
+                    content_key = await self._content_cache_key(path)
+                    if await self._save_from_cache(doc, [content_key]):
+                        self._remove(path)
+                    else:
+                        await extractions.put((doc, path, content_key))
+                except BaseException:
+                    self._remove(path)
+                    raise
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.exception("Error downloading document %s: %s", doc.id, exc)
+                await self._mark_error(doc)
+            finally:
+                downloads.task_done()
+
+    async def _extract_worker(self, extractions: asyncio.Queue, summaries: asyncio.Queue) -> None:
+        while True:
+            doc, path, content_key = await extractions.get()
+            try:
+                text = await self._extract_text(path, doc.file_type)
+                if text is None:
+                    await self._mark_error(doc)
+                else:
+                    await summaries.put((doc, text, content_key))
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.exception("Error extracting document %s: %s", doc.id, exc)
+                await self._mark_error(doc)
+            finally:
+                self._remove(path)
+                extractions.task_done()
 
-    async def run_forever(self, poll_interval: float = 5.0):
+    async def _summarize_worker(self, summaries: asyncio.Queue) -> None:
         while True:
-            await self.run_once()
-            await asyncio.sleep(poll_interval)
+            doc, text, content_key = await summaries.get()
+            try:
+                if not self._owns(doc):
+                    continue
+                summary = await self._summarize(text)
+                await self._save_summary(doc, summary, [*self._file_cache_keys(doc), content_key])
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.exception("Error summarizing document %s: %s", doc.id, exc)
+                await self._mark_error(doc)
+            finally:
+                summaries.task_done()
+
+    async def run_forever(self, poll_interval: float | None = None):
+        poll_interval = poll_interval if poll_interval is not None else self._cfg.DOCUMENT_POLL_INTERVAL_SEC
+        queue_size = self._cfg.DOCUMENT_QUEUE_SIZE
+        downloads: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        extractions: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        summaries: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        Metrics.document_pipeline_queue_depth.set_function(downloads.qsize, stage="download")
+        Metrics.document_pipeline_queue_depth.set_function(extractions.qsize, stage="extract")
+        Metrics.document_pipeline_queue_depth.set_function(summaries.qsize, stage="summarize")
+
+        workers = [
+            *(self._download_worker(downloads, extractions) for _ in range(self._cfg.DOCUMENT_DOWNLOAD_WORKERS)),
+            *(self._extract_worker(extractions, summaries) for _ in range(self._cfg.DOCUMENT_EXTRACT_PROCESSES)),
+            *(self._summarize_worker(summaries) for _ in range(self._cfg.DOCUMENT_SUMMARIZE_WORKERS)),
+        ]
+        try:
+            await asyncio.gather(self._feed(downloads, poll_interval), self._renew_leases_forever(), *workers)
+        finally:
+            await self._unlisten()
+            self.close()
 
 
 async def run():  # entry for scripts
     from app.bot.bot import BOT  # local import to avoid circular deps
 
     processor = DocumentProcessor(BOT)
-    await processor.run_forever()
+    await ExternalServices.start()
+    try:
+        await processor.run_forever()
+    finally:
+        await ExternalServices.stop()
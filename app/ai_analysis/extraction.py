@@ -0,0 +1,193 @@
+"""
+Text extraction from downloaded documents, bounded in memory regardless of file size.
+
+Extractors are registered per mime type with :func:`register_extractor`. Each one is a
+generator yielding the text of a file piece by piece (pages, paragraphs or blocks), so
+:func:`extract_text` stops reading as soon as the page or character budget is spent.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import mmap
+import zipfile
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from itertools import islice
+from typing import Callable, Iterable, Iterator
+from xml.etree.ElementTree import iterparse
+
+import fitz
+from charset_normalizer import from_bytes
+
+from app.ai_analysis.file_check import SUPPORTED_FILE_TYPES, normalize_mime_type
+
+HASH_CHUNK_SIZE = 1024 * 1024
+TEXT_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True, slots=True)
+class Extractor:
+    name: str
+    iter_text: Callable[[str], Iterator[str]]
+    paged: bool = False  # yields one page at a time, so the page budget applies
+
+
+_EXTRACTORS: dict[str, Extractor] = {}
+
+
+def register_extractor(*mime_types: str, paged: bool = False):
+    """Mime types have to be listed in ``SUPPORTED_FILE_TYPES`` too, or files of them are never downloaded."""
+    unknown = set(mime_types) - set(SUPPORTED_FILE_TYPES)
+    if unknown:
+        raise ValueError(f"Not in SUPPORTED_FILE_TYPES: {sorted(unknown)}")
+
+    def decorator(iter_text: Callable[[str], Iterator[str]]) -> Callable[[str], Iterator[str]]:
+        extractor = Extractor(name=iter_text.__name__, iter_text=iter_text, paged=paged)
+        for mime_type in mime_types:
+            _EXTRACTORS[mime_type] = extractor
+        return iter_text
+
+    return decorator
+
+
+def get_extractor(file_type: str | None) -> Extractor | None:
+    if not file_type:
+        return None
+    return _EXTRACTORS.get(normalize_mime_type(file_type))
+
+
+def supported_file_types() -> list[str]:
+    return sorted(_EXTRACTORS)
+
+
+def collect_text(chunks: Iterable[str], max_chars: int) -> str:
+    """Join *chunks* until *max_chars* characters are collected."""
+    parts = []
+    remaining = max_chars
+    for chunk in chunks:
+        if remaining <= 0:
+            break
+        parts.append(chunk[:remaining])
+        remaining -= len(parts[-1])
+    return "".join(parts).strip()
+
+
+def extract_text(path: str, file_type: str, max_pages: int, max_chars: int) -> str:
+    """
+    Text of the file at *path*, at most *max_pages* pages and *max_chars* characters.
+    CPU-bound, meant to run in a worker process.
+    """
+    extractor = get_extractor(file_type)
+    if extractor is None:
+        raise ValueError(f"Unsupported file type: {file_type}")
+    chunks = extractor.iter_text(path)
+    if extractor.paged:
+        chunks = islice(chunks, max_pages)
+    return collect_text(chunks, max_chars)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _iter_mupdf_pages(path: str, filetype: str) -> Iterator[str]:
+    # The file is memory-mapped, so only the pages being parsed are held in memory
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        buffer = memoryview(mapped)
+        try:
+            with fitz.open(stream=buffer, filetype=filetype) as doc:
+                for page in doc:
+                    yield page.get_text()
+        finally:
+            buffer.release()
+
+
+@register_extractor("application/pdf", paged=True)
+def iter_pdf_pages(path: str) -> Iterator[str]:
+    return _iter_mupdf_pages(path, "pdf")
+
+
+@register_extractor("application/epub+zip", paged=True)
+def iter_epub_pages(path: str) -> Iterator[str]:
+    return _iter_mupdf_pages(path, "epub")
+
+
+def _detect_encoding(path: str) -> str:
+    with open(path, "rb") as file:
+        sample = file.read(TEXT_CHUNK_SIZE)
+    try:
+        sample.decode("utf-8")
+        return "utf-8-sig"
+    except UnicodeDecodeError as exc:
+        # A multi-byte character cut at the end of the sample is still UTF-8
+        if exc.start >= len(sample) - 3 and len(sample) == TEXT_CHUNK_SIZE:
+            return "utf-8-sig"
+    match = from_bytes(sample).best()
+    return match.encoding if match is not None else "utf-8"
+
+
+@register_extractor("text/plain", "text/csv", "text/markdown", "text/x-markdown")
+def iter_plain_text(path: str) -> Iterator[str]:
+    with open(path, encoding=_detect_encoding(path), errors="replace", newline="") as file:
+        while chunk := file.read(TEXT_CHUNK_SIZE):
+            yield chunk
+
+
+class _HTMLTextParser(HTMLParser):
+    SKIPPED_TAGS = {"script", "style", "head", "template", "noscript"}
+    BLOCK_TAGS = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "section", "article", "pre"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self._skipped_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED_TAGS:
+            self._skipped_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED_TAGS and self._skipped_depth:
+            self._skipped_depth -= 1
+
+    def handle_data(self, data):
+        if not self._skipped_depth:
+            self.parts.append(data)
+
+
+@register_extractor("text/html", "application/xhtml+xml")
+def iter_html_text(path: str) -> Iterator[str]:
+    parser = _HTMLTextParser()
+    for chunk in iter_plain_text(path):
+        parser.feed(chunk)
+        if parser.parts:
+            yield "".join(parser.parts)
+            parser.parts.clear()
+    parser.close()
+    yield "".join(parser.parts)
+
+
+_WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+@register_extractor("application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+def iter_docx_paragraphs(path: str) -> Iterator[str]:
+    with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as xml:
+        parts: list[str] = []
+        for _event, element in iterparse(xml, events=("end",)):
+            if element.tag == f"{_WORD_NAMESPACE}t" and element.text:
+                parts.append(element.text)
+            elif element.tag == f"{_WORD_NAMESPACE}tab":
+                parts.append("\t")
+            elif element.tag == f"{_WORD_NAMESPACE}p":
+                yield "".join(parts) + "\n"
+                parts.clear()
+                # Paragraphs are done with, don't keep the parsed tree around
+                element.clear()
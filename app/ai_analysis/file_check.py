@@ -0,0 +1,57 @@
+"""
+Which documents are worth downloading, judged by mime type and size alone.
+
+Kept free of extractor dependencies, so the bot can check documents as they arrive without
+loading PyMuPDF and friends. The extractors in app/ai_analysis/extraction.py are registered
+for exactly the types listed here.
+"""
+
+from __future__ import annotations
+
+from typing import Sequence
+
+from app.models.models import AnalysisProcessingStatusEnum
+from app.settings import Settings
+
+MB = 1024 * 1024
+
+# Mime types that can be summarized and the largest file of each that is downloaded at all
+SUPPORTED_FILE_TYPES: dict[str, int] = {
+    "application/pdf": 20 * MB,
+    "application/epub+zip": 20 * MB,
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": 20 * MB,
+    "text/plain": 5 * MB,
+    "text/csv": 5 * MB,
+    "text/markdown": 5 * MB,
+    "text/x-markdown": 5 * MB,
+    "text/html": 5 * MB,
+    "application/xhtml+xml": 5 * MB,
+}
+
+
+def normalize_mime_type(file_type: str) -> str:
+    return file_type.split(";", 1)[0].strip().lower()
+
+
+class FileCheck:
+    """Status a new document starts in, from its mime type and size."""
+
+    def __init__(self, max_file_size: int, allowed_file_types: Sequence[str] = ()):
+        self._max_file_size = max_file_size
+        self._allowed_file_types = {file_type.lower() for file_type in allowed_file_types}
+
+    @classmethod
+    def from_settings(cls, cfg: Settings) -> FileCheck:
+        return cls(max_file_size=cfg.DOCUMENT_MAX_FILE_SIZE_BYTES, allowed_file_types=cfg.DOCUMENT_ALLOWED_FILE_TYPES)
+
+    def check(self, file_type: str | None, file_size: int | None) -> AnalysisProcessingStatusEnum:
+        mime_type = normalize_mime_type(file_type) if file_type else ""
+        type_max_file_size = SUPPORTED_FILE_TYPES.get(mime_type)
+        if type_max_file_size is None:
+            return AnalysisProcessingStatusEnum.UNSUPPORTED
+        if self._allowed_file_types and mime_type not in self._allowed_file_types:
+            return AnalysisProcessingStatusEnum.REJECTED
+        # Files of unknown size are let through, the download fails on its own if they are too large
+        if file_size is not None and file_size > min(self._max_file_size, type_max_file_size):
+            return AnalysisProcessingStatusEnum.REJECTED
+        return AnalysisProcessingStatusEnum.NOT_STARTED
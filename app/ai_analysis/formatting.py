@@ -0,0 +1,67 @@
+"""Turns plain text into messages for the bot's HTML parse mode that fit Telegram's length limit."""
+
+from __future__ import annotations
+
+import html
+import re
+
+# Counted after entity parsing, in UTF-16 code units
+TELEGRAM_MESSAGE_MAX_LENGTH = 4096
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+def telegram_length(text: str) -> int:
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _pack(pieces: list[str], separator: str, limit: int) -> list[str]:
+    """Greedily join *pieces* (each within *limit*) with *separator* into as few parts as possible."""
+    parts: list[str] = []
+    current = ""
+    for piece in pieces:
+        candidate = f"{current}{separator}{piece}" if current else piece
+        if current and telegram_length(candidate) > limit:
+            parts.append(current)
+            candidate = piece
+        current = candidate
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _hard_split(text: str, limit: int) -> list[str]:
+    parts, start, length = [], 0, 0
+    for index, char in enumerate(text):
+        char_length = 2 if ord(char) > 0xFFFF else 1
+        if length + char_length > limit:
+            parts.append(text[start:index])
+            start, length = index, 0
+        length += char_length
+    parts.append(text[start:])
+    return parts
+
+
+def _split(text: str, limit: int, separators: tuple[str, ...]) -> list[str]:
+    if telegram_length(text) <= limit:
+        return [text]
+    if not separators:
+        return _hard_split(text, limit)
+    separator, rest = separators[0], separators[1:]
+    pieces = [piece for chunk in text.split(separator) for piece in _split(chunk, limit, rest) if piece]
+    return _pack(pieces, separator, limit)
+
+
+def split_message(text: str, limit: int = TELEGRAM_MESSAGE_MAX_LENGTH) -> list[str]:
+    """
+    Split plain *text* into parts of at most *limit* characters, breaking between paragraphs
+    where possible, then between lines, then between words. Parts are HTML-escaped, so text
+    with ``<`` or ``&`` (common in model output) is shown as is instead of failing to parse.
+    """
+    paragraphs = [
+        piece
+        for paragraph in _PARAGRAPH_BREAK.split(text.strip())
+        for piece in _split(paragraph.strip(), limit, ("\n", " "))
+        if piece
+    ]
+    return [html.escape(part, quote=False) for part in _pack(paragraphs, "\n\n", limit)]
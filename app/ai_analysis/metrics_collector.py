@@ -0,0 +1,39 @@
+"""Periodically samples gauges that can only be read from the database."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime
+
+from app.external_services.external_services import ExternalServices
+from app.metrics import Metrics
+from app.models.models import AnalysisProcessingStatusEnum
+from app.repositories import Repositories
+from app.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseMetricsCollector:
+    def __init__(self):
+        self._cfg = get_settings()
+
+    async def run_once(self, now: datetime | None = None) -> None:
+        now = now or datetime.utcnow()
+        # A read-only session is one snapshot, so both gauges describe the same moment
+        async with ExternalServices.database.session(read_only=True) as session:
+            counts = await Repositories.documents.count_by_status(session)
+            next_summary_at = await Repositories.chats.get_next_summary_at(now, session)
+        for status in AnalysisProcessingStatusEnum:
+            Metrics.documents_by_status.set(counts.get(status.value, 0), status=status.value)
+        lag = (now - next_summary_at).total_seconds() if next_summary_at is not None else 0
+        Metrics.digest_schedule_lag_seconds.set(max(lag, 0))
+
+    async def run_forever(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.exception("Failed to collect database metrics: %s", exc)
+            await asyncio.sleep(self._cfg.METRICS_COLLECT_INTERVAL_SEC)
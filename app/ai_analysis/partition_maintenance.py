@@ -0,0 +1,88 @@
+"""Keeps monthly partitions of the messages table created ahead of time and drops expired ones."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import date, datetime
+
+from app.external_services.external_services import ExternalServices
+from app.metrics import Metrics
+from app.repositories import Repositories
+from app.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class MessagePartitionMaintainer:
+    CHECK_INTERVAL_SEC = 6 * 60 * 60
+    # Documents of an expired partition are deleted in transactions of this many rows
+    DELETE_BATCH_SIZE = 1000
+    # How long dropping a partition may wait for its exclusive lock on messages
+    DROP_LOCK_TIMEOUT_MS = 5000
+
+    def __init__(self):
+        self._cfg = get_settings()
+
+    def _retention_cutoff(self, today: date) -> date | None:
+        months = self._cfg.MESSAGES_RETENTION_MONTHS
+        if months <= 0:
+            return None
+        index = today.year * 12 + today.month - 1 - months
+        return date(index // 12, index % 12 + 1, 1)
+
+    async def _drop_partitions_before(self, cutoff: date) -> list[str]:
+        """
+        Drop expired partitions one at a time: their documents go first in short transactions,
+        then the partition is detached and dropped in one more. A partition that can't be
+        dropped now is counted and tried again on the next run.
+        """
+        async with ExternalServices.database.session(autocommit=True) as session:
+            expired = await Repositories.partitions.get_messages_partitions_before(cutoff, session)
+        dropped = []
+        for name in expired:
+            try:
+                deleted = self.DELETE_BATCH_SIZE
+                while deleted >= self.DELETE_BATCH_SIZE:
+                    async with ExternalServices.database.session() as session:
+                        deleted = await Repositories.partitions.delete_partition_documents(
+                            name, self.DELETE_BATCH_SIZE, session
+                        )
+                async with ExternalServices.database.session() as session:
+                    await Repositories.partitions.drop_messages_partition(name, self.DROP_LOCK_TIMEOUT_MS, session)
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.exception("Failed to drop messages partition %s: %s", name, exc)
+                Metrics.messages_partitions_dropped.inc(outcome="failed")
+                continue
+            Metrics.messages_partitions_dropped.inc(outcome="dropped")
+            dropped.append(name)
+        return dropped
+
+    async def run_once(self, today: date | None = None) -> None:
+        today = today or datetime.utcnow().date()
+        async with ExternalServices.database.session() as session:
+            created = await Repositories.partitions.create_messages_partitions(
+                today, self._cfg.MESSAGES_PARTITIONS_AHEAD_MONTHS, session
+            )
+        dropped = []
+        if cutoff := self._retention_cutoff(today):
+            dropped = await self._drop_partitions_before(cutoff)
+        if created or dropped:
+            logger.info("Messages partitions created: %s, dropped: %s", created, dropped)
+
+    async def run_forever(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.exception("Messages partition maintenance failed: %s", exc)
+            await asyncio.sleep(self.CHECK_INTERVAL_SEC)
+
+
+async def run():  # entry for scripts
+    maintainer = MessagePartitionMaintainer()
+    await ExternalServices.start()
+    try:
+        await maintainer.run_once()
+    finally:
+        await ExternalServices.stop()
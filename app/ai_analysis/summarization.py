@@ -0,0 +1,142 @@
+"""Token-aware map-reduce summarization for inputs that don't fit into one model context."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Context window sizes (prompt + completion) of commonly used models
+MODEL_CONTEXT_TOKENS: dict[str, int] = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "gpt-4.1": 1047576,
+    "gpt-4.1-mini": 1047576,
+    "gpt-4.1-nano": 1047576,
+}
+DEFAULT_CONTEXT_TOKENS = 8192
+
+# (system prompt, user content, max completion tokens) -> completion text
+Completion = Callable[[str, str, int], Awaitable[str]]
+
+
+def context_tokens_for_model(model: str) -> int:
+    if model in MODEL_CONTEXT_TOKENS:
+        return MODEL_CONTEXT_TOKENS[model]
+    # Dated snapshots such as "gpt-4o-2024-08-06" share the context of their family
+    for name in sorted(MODEL_CONTEXT_TOKENS, key=len, reverse=True):
+        if model.startswith(name):
+            return MODEL_CONTEXT_TOKENS[name]
+    return DEFAULT_CONTEXT_TOKENS
+
+
+class TokenCounter:
+    """
+    Counts tokens locally with tiktoken. When the encoding can't be loaded (the BPE files are
+    fetched on first use) it falls back to a conservative estimate of 3 characters per token.
+    """
+
+    CHARS_PER_TOKEN = 3
+
+    def __init__(self, model: str):
+        self._encoding = None
+        try:
+            import tiktoken
+
+            try:
+                self._encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("tiktoken is unavailable, estimating token counts: %s", exc)
+
+    def count(self, text: str) -> int:
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return len(text) // self.CHARS_PER_TOKEN + 1
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if self._encoding is not None:
+            return self._encoding.decode(self._encoding.encode(text, disallowed_special=())[:max_tokens])
+        return text[: max_tokens * self.CHARS_PER_TOKEN]
+
+
+def split_into_chunks(texts: Sequence[str], max_tokens: int, counter: TokenCounter) -> list[list[str]]:
+    """Greedily pack *texts* into chunks of at most *max_tokens*; oversized texts are truncated."""
+    chunks: list[list[str]] = []
+    current: list[str] = []
+    current_tokens = 0
+    for text in texts:
+        tokens = counter.count(text) + 1  # joined with a newline
+        if tokens > max_tokens:
+            text = counter.truncate(text, max_tokens - 1)
+            tokens = max_tokens
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class MapReduceSummarizer:
+    """
+    Summarizes a list of texts with a single completion when they fit into the model context.
+    Otherwise the texts are split into chunks that are summarized concurrently (map), and the
+    partial summaries are merged (reduce), repeating until they fit into the final prompt.
+    """
+
+    MAP_PROMPT = (
+        "You are a helpful assistant that condenses a part of a group chat log. "
+        "List the topics discussed, decisions made and important facts as concise plain text (no markdown)."
+    )
+    PROMPT_MARGIN_TOKENS = 64
+
+    def __init__(
+        self,
+        complete: Completion,
+        counter: TokenCounter,
+        context_tokens: int,
+        map_max_tokens: int = 500,
+        concurrency: int = 4,
+    ):
+        self._complete = complete
+        self._counter = counter
+        self._context_tokens = context_tokens
+        self._map_max_tokens = map_max_tokens
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    def _input_budget(self, system_prompt: str, max_tokens: int) -> int:
+        budget = self._context_tokens - max_tokens - self._counter.count(system_prompt) - self.PROMPT_MARGIN_TOKENS
+        # Room for at least two partial summaries, otherwise reducing would never converge
+        if budget < 2 * self._map_max_tokens:
+            raise ValueError("Model context is too small for the requested completion size")
+        return budget
+
+    async def _map(self, chunk: Sequence[str]) -> str:
+        async with self._semaphore:
+            return await self._complete(self.MAP_PROMPT, "\n".join(chunk), self._map_max_tokens)
+
+    async def summarize(self, texts: Sequence[str], system_prompt: str, max_tokens: int) -> str:
+        final_budget = self._input_budget(system_prompt, max_tokens)
+        map_budget = self._input_budget(self.MAP_PROMPT, self._map_max_tokens)
+
+        texts = list(texts)
+        while True:
+            chunks = split_into_chunks(texts, final_budget, self._counter)
+            if len(chunks) <= 1:
+                break
+            # Partial summaries are much shorter than their input, so this converges
+            chunks = split_into_chunks(texts, map_budget, self._counter)
+            logger.info("Summarizing %s texts in %s chunks", len(texts), len(chunks))
+            texts = list(await asyncio.gather(*(self._map(chunk) for chunk in chunks)))
+
+        body = "\n".join(chunks[0]) if chunks else ""
+        return await self._complete(system_prompt, body, max_tokens)
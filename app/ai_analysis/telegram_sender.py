@@ -0,0 +1,163 @@
+"""Rate-limited sending of bot messages that copes with flood waits and transient errors."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramMigrateToChat,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+
+from app.ai_analysis.formatting import split_message
+from app.external_services.rate_limiter import TokenBucket
+from app.metrics import Metrics
+from app.models.models import DeliveryStatusEnum
+from app.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class DeliveryResult:
+    status: DeliveryStatusEnum
+    error: str | None = None
+    retry_in_sec: float = 0.0  # how long to wait before the next attempt when PENDING
+    parts_sent: int = 0  # messages of a split text that reached the chat
+    migrated_to_chat_id: int | None = None  # the group became a supergroup with this id
+
+
+@dataclass(slots=True)
+class _ChatState:
+    bucket: TokenBucket
+    # Held for a whole delivery, so messages to one chat keep their order across retries
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class TelegramSender:
+    """
+    Sends messages at the highest rate Telegram allows: ``messages_per_second`` for the bot
+    overall, one message per second in a private chat and ``chat_messages_per_minute`` in a group.
+
+    Flood waits (``retry_after``), network and server errors are retried in place up to
+    ``send_attempts`` times, but never past the caller's deadline; what still fails is left to
+    the outbox, see app/ai_analysis/delivery.py. Errors Telegram won't change its mind about
+    (bot blocked or removed, malformed message) fail the message right away.
+    """
+
+    CHAT_STATES_MAX_SIZE = 10000
+    PRIVATE_CHAT_MESSAGES_PER_SECOND = 1.0
+    IN_PLACE_BASE_DELAY_SEC = 1.0
+    # Flood waits longer than this are left to the outbox instead of blocking the caller
+    MAX_IN_PLACE_WAIT_SEC = 60
+
+    def __init__(
+        self,
+        bot: Bot,
+        messages_per_second: float = 25,
+        chat_messages_per_minute: float = 20,
+        send_attempts: int = 3,
+    ):
+        self._bot = bot
+        self._global_bucket = TokenBucket(messages_per_second)
+        self._chat_messages_per_minute = chat_messages_per_minute
+        self._chats: OrderedDict[int, _ChatState] = OrderedDict()
+        self._send_attempts = max(send_attempts, 1)
+
+    @classmethod
+    def from_settings(cls, bot: Bot, cfg: Settings) -> TelegramSender:
+        return cls(
+            bot,
+            messages_per_second=cfg.TELEGRAM_MESSAGES_PER_SECOND,
+            chat_messages_per_minute=cfg.TELEGRAM_CHAT_MESSAGES_PER_MINUTE,
+            send_attempts=cfg.TELEGRAM_SEND_ATTEMPTS,
+        )
+
+    def _chat_state(self, chat_id: int) -> _ChatState:
+        state = self._chats.get(chat_id)
+        if state is not None:
+            self._chats.move_to_end(chat_id)
+            return state
+        if chat_id > 0:
+            bucket = TokenBucket(self.PRIVATE_CHAT_MESSAGES_PER_SECOND)
+        else:
+            bucket = TokenBucket.per_minute(self._chat_messages_per_minute)
+        state = self._chats[chat_id] = _ChatState(bucket)
+        # Forgetting the least recently used chats only resets their allowance
+        while len(self._chats) > self.CHAT_STATES_MAX_SIZE:
+            oldest_id, oldest = next(iter(self._chats.items()))
+            if oldest.lock.locked():
+                break
+            del self._chats[oldest_id]
+        return state
+
+    async def _send_part(self, state: _ChatState, chat_id: int, text: str, deadline: float | None) -> DeliveryResult:
+        """Send one message with up to ``send_attempts`` attempts; TelegramMigrateToChat is passed on."""
+        error, retry_in = None, 0.0
+        for attempt in range(1, self._send_attempts + 1):
+            await state.bucket.acquire()
+            await self._global_bucket.acquire()
+            try:
+                await self._bot.send_message(chat_id, text)
+                Metrics.telegram_sends.inc(outcome="sent")
+                return DeliveryResult(DeliveryStatusEnum.SENT)
+            except TelegramRetryAfter as exc:
+                Metrics.telegram_sends.inc(outcome="flood_wait")
+                logger.warning("Flood wait of %ss for chat %s", exc.retry_after, chat_id)
+                error, retry_in = str(exc), float(exc.retry_after)
+                if retry_in > self.MAX_IN_PLACE_WAIT_SEC:
+                    break
+            except TelegramMigrateToChat:
+                raise
+            except (TelegramNetworkError, TelegramServerError) as exc:
+                Metrics.telegram_sends.inc(outcome="error")
+                error, retry_in = str(exc), self.IN_PLACE_BASE_DELAY_SEC * 2 ** (attempt - 1)
+            except TelegramAPIError as exc:
+                Metrics.telegram_sends.inc(outcome="rejected")
+                logger.warning("Telegram rejected a message to %s: %s", chat_id, exc)
+                return DeliveryResult(DeliveryStatusEnum.FAILED, str(exc))
+            if deadline is not None and time.monotonic() + retry_in > deadline:
+                break
+            # The chat lock is kept while waiting, so later messages can't overtake this one
+            if attempt < self._send_attempts:
+                await asyncio.sleep(retry_in)
+        return DeliveryResult(DeliveryStatusEnum.PENDING, error, retry_in)
+
+    async def deliver(
+        self, chat_id: int, text: str, parts_sent: int = 0, deadline: float | None = None
+    ) -> DeliveryResult:
+        """
+        Send plain *text*, escaped and split into as many messages as Telegram's length limit
+        needs (see :func:`split_message`). Parts before *parts_sent* were delivered by an earlier
+        attempt and are skipped. PENDING means the rest is worth trying later.
+
+        No part is started and no retry is waited for after *deadline* (a :func:`time.monotonic`
+        value), so the call ends at most one send after it.
+        """
+        parts = split_message(text)
+        state = self._chat_state(chat_id)
+        try:
+            async with state.lock:
+                while parts_sent < len(parts):
+                    if deadline is not None and time.monotonic() >= deadline:
+                        return DeliveryResult(DeliveryStatusEnum.PENDING, "Out of time", parts_sent=parts_sent)
+                    result = await self._send_part(state, chat_id, parts[parts_sent], deadline)
+                    if result.status is not DeliveryStatusEnum.SENT:
+                        result.parts_sent = parts_sent
+                        return result
+                    parts_sent += 1
+        except TelegramMigrateToChat as exc:
+            # The group became a supergroup with a new id
+            logger.info("Chat %s migrated to %s", chat_id, exc.migrate_to_chat_id)
+            result = await self.deliver(exc.migrate_to_chat_id, text, parts_sent, deadline)
+            result.migrated_to_chat_id = result.migrated_to_chat_id or exc.migrate_to_chat_id
+            return result
+        return DeliveryResult(DeliveryStatusEnum.SENT, parts_sent=parts_sent)
@@ -1,15 +1,56 @@
+from datetime import timedelta
+
 import aiogram
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
 
+from app.bot.fsm_storage import PostgresStorage
 from app.bot.middlewares.auth import AuthMiddleware
 from app.bot.routes.start import router as start_router
 from app.bot.routes.set_time import router as set_time_router
 from app.bot.routes.add_to_channel import router as add_to_channel_router
 from app.bot.routes.record_messages import router as record_messages_router
+from app.external_services.external_services import ExternalServices
+from app.services import Services
+from app.settings import Settings, get_settings
+
+
+def _make_fsm_storage(config: Settings) -> BaseStorage:
+    if config.FSM_STORAGE == "memory":
+        return MemoryStorage()
+    if config.FSM_STORAGE == "postgres":
+        return PostgresStorage(
+            ttl=timedelta(seconds=config.FSM_STATE_TTL_SEC),
+            cleanup_interval_sec=config.FSM_CLEANUP_INTERVAL_SEC,
+            cleanup_batch_size=config.FSM_CLEANUP_BATCH_SIZE,
+        )
+    raise ValueError(f"Unknown FSM_STORAGE: {config.FSM_STORAGE!r}")
+
 
-dispatcher = aiogram.Dispatcher()
+fsm_storage = _make_fsm_storage(get_settings())
+dispatcher = aiogram.Dispatcher(storage=fsm_storage)
 
 dispatcher.message.middleware(AuthMiddleware())
 dispatcher.include_router(start_router)
 dispatcher.include_router(set_time_router)
 dispatcher.include_router(add_to_channel_router)
 dispatcher.include_router(record_messages_router)
+
+
+@dispatcher.startup()
+async def on_startup() -> None:
+    await ExternalServices.start()
+    await Services.ingestion.start()
+    await Services.metrics.start()
+    if isinstance(fsm_storage, PostgresStorage):
+        await fsm_storage.start()
+
+
+@dispatcher.shutdown()
+async def on_shutdown() -> None:
+    # Flush buffered messages before the process exits
+    await Services.ingestion.stop()
+    if isinstance(fsm_storage, PostgresStorage):
+        await fsm_storage.stop()
+    await Services.metrics.stop()
+    await ExternalServices.stop()
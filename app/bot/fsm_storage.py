@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+
+from app.external_services.external_services import ExternalServices
+from app.repositories import Repositories
+
+logger = logging.getLogger(__name__)
+
+
+class PostgresStorage(BaseStorage):
+    """
+    FSM storage in the ``fsm_states`` table, so every bot replica sees the same conversation
+    state and it survives restarts.
+
+    Each write extends the conversation's lifetime by ``ttl``; a conversation left alone for
+    longer reads as empty, and a background task deletes such rows ``cleanup_batch_size`` at
+    a time. With ``private_chats_only`` (every conversation of the bot happens in private
+    chats) keys of group chats never reach the database: the FSM middleware looks the state
+    up for every update, which would otherwise cost a query per recorded group message.
+    """
+
+    def __init__(
+        self,
+        ttl: timedelta,
+        cleanup_interval_sec: float = 300,
+        cleanup_batch_size: int = 1000,
+        private_chats_only: bool = True,
+        key_builder: KeyBuilder | None = None,
+    ):
+        self._ttl = ttl
+        self._cleanup_interval_sec = cleanup_interval_sec
+        self._cleanup_batch_size = cleanup_batch_size
+        self._private_chats_only = private_chats_only
+        self._key_builder = key_builder or DefaultKeyBuilder()
+        self._cleanup_task: asyncio.Task | None = None
+
+    def _is_stored(self, key: StorageKey) -> bool:
+        return not self._private_chats_only or key.chat_id == key.user_id
+
+    def _times(self) -> tuple[datetime, datetime]:
+        now = datetime.utcnow()
+        return now, now + self._ttl
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state = state.state if isinstance(state, State) else state
+        if not self._is_stored(key):
+            if state is not None:
+                raise ValueError("FSM states are only kept for private chats")
+            return
+        now, expires_at = self._times()
+        async with ExternalServices.database.session() as session:
+            await Repositories.fsm.set_state(self._key_builder.build(key), state, now, expires_at, session)
+            if state is None:
+                await Repositories.fsm.delete_if_empty(self._key_builder.build(key), session)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        if not self._is_stored(key):
+            return None
+        async with ExternalServices.database.session(autocommit=True) as session:
+            row = await Repositories.fsm.get(self._key_builder.build(key), datetime.utcnow(), session)
+        return row.state if row else None
+
+    async def set_data(self, key: StorageKey, data: dict[str, Any]) -> None:
+        if not self._is_stored(key):
+            if data:
+                raise ValueError("FSM data is only kept for private chats")
+            return
+        now, expires_at = self._times()
+        async with ExternalServices.database.session() as session:
+            await Repositories.fsm.set_data(self._key_builder.build(key), data, now, expires_at, session)
+            if not data:
+                await Repositories.fsm.delete_if_empty(self._key_builder.build(key), session)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        if not self._is_stored(key):
+            return {}
+        async with ExternalServices.database.session(autocommit=True) as session:
+            row = await Repositories.fsm.get(self._key_builder.build(key), datetime.utcnow(), session)
+        return dict(row.data) if row else {}
+
+    async def update_data(self, key: StorageKey, data: dict[str, Any]) -> dict[str, Any]:
+        if not self._is_stored(key):
+            if data:
+                raise ValueError("FSM data is only kept for private chats")
+            return {}
+        now, expires_at = self._times()
+        async with ExternalServices.database.session() as session:
+            return await Repositories.fsm.update_data(self._key_builder.build(key), data, now, expires_at, session)
+
+    async def cleanup_once(self) -> int:
+        """Delete expired conversations batch by batch, each batch in its own short transaction."""
+        deleted = 0
+        while True:
+            async with ExternalServices.database.session() as session:
+                batch = await Repositories.fsm.delete_expired(datetime.utcnow(), self._cleanup_batch_size, session)
+            deleted += batch
+            if batch < self._cleanup_batch_size:
+                return deleted
+
+    async def _cleanup_forever(self) -> None:
+        while True:
+            try:
+                if deleted := await self.cleanup_once():
+                    logger.info("Deleted %s expired FSM states", deleted)
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.exception("FSM states cleanup failed: %s", exc)
+            await asyncio.sleep(self._cleanup_interval_sec)
+
+    async def start(self) -> None:
+        if self._cleanup_task is None and self._cleanup_interval_sec > 0:
+            self._cleanup_task = asyncio.create_task(self._cleanup_forever())
+
+    async def stop(self) -> None:
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+            await asyncio.gather(self._cleanup_task, return_exceptions=True)
+            self._cleanup_task = None
+
+    async def close(self) -> None:
+        await self.stop()
@@ -12,4 +12,4 @@ async def record_all_messages(message: types.Message):
     if message.content_type not in [ContentType.TEXT, ContentType.DOCUMENT]:
         return
 
-    await Services.chats.add_message(message)
+    await Services.chats.enqueue_message(message)
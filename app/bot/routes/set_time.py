@@ -44,7 +44,6 @@ async def start(message: types.Message, state: FSMContext, authorized_user: DBUs
 async def choose_chat(message: types.Message, state: FSMContext) -> None:
     try:
         chat_id = message.text.split()[-1].strip("()")
-        print(chat_id)
         await state.update_data(chat_id=int(chat_id))
     except ValueError:
         await message.answer("Invalid chat ID. Please try again. /set_time", reply_markup=ReplyKeyboardRemove())
@@ -56,12 +55,13 @@ async def choose_chat(message: types.Message, state: FSMContext) -> None:
 @router.message(SetTimeState.set_time)
 async def set_time(message: types.Message, state: FSMContext) -> None:
     try:
-        await state.update_data(time=time.fromisoformat(message.text))
+        summary_time = time.fromisoformat(message.text)
     except ValueError:
         await message.answer("Invalid time format. Please try again. /set_time")
         return
+    # The state is stored as JSON, so the time itself is never put there
     data = await state.get_data()
-    await Services.chats.set_summary_time(data["chat_id"], data["time"])
+    await Services.chats.set_summary_time(data["chat_id"], summary_time)
     await message.answer("Time for daily summaries has been set successfully.")
     await state.clear()
 
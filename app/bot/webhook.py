@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+from typing import Any
+
+import aiogram
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from app.metrics import Metrics
+from app.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# Characters Telegram accepts in secret_token
+SECRET_TOKEN_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,256}$")
+
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """
+    Answers Telegram right away and feeds updates to the dispatcher in background tasks,
+    at most ``max_concurrent_updates`` at a time. Once the limit is reached, new requests
+    wait for a free slot before they are acknowledged, so Telegram slows down instead of
+    the replica piling up tasks.
+
+    On shutdown the handler stops taking updates (Telegram redelivers them, possibly to
+    another replica) and waits up to ``drain_timeout_sec`` for the running ones.
+    """
+
+    def __init__(
+        self,
+        dispatcher: aiogram.Dispatcher,
+        bot: aiogram.Bot,
+        secret_token: str,
+        max_concurrent_updates: int = 100,
+        drain_timeout_sec: float = 25,
+        **data: Any,
+    ):
+        super().__init__(dispatcher=dispatcher, bot=bot, handle_in_background=True, secret_token=secret_token, **data)
+        self._slots = asyncio.Semaphore(max_concurrent_updates)
+        self._drain_timeout_sec = drain_timeout_sec
+        self._draining = False
+
+    def register(self, app: web.Application, /, path: str, **kwargs: Any) -> None:
+        # Draining has to finish before the dispatcher shutdown flushes buffered messages,
+        # and the bot session is needed until then, so it's closed on cleanup instead
+        app.on_shutdown.append(self._drain)
+        app.on_cleanup.append(self._handle_close)
+        app.router.add_route("POST", path, self.handle, **kwargs)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if self._draining:
+            return web.Response(status=503, headers={"Retry-After": "1"})
+        return await super().handle(request)
+
+    async def _handle_request_background(self, bot: aiogram.Bot, request: web.Request) -> web.Response:
+        update = await request.json(loads=bot.session.json_loads)
+        await self._slots.acquire()
+        if self._draining:
+            self._slots.release()
+            return web.Response(status=503, headers={"Retry-After": "1"})
+        Metrics.webhook_updates_in_flight.inc()
+        task = asyncio.create_task(self._background_feed_update(bot=bot, update=update))
+        self._background_feed_update_tasks.add(task)
+        task.add_done_callback(self._on_update_done)
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    def _on_update_done(self, task: asyncio.Task) -> None:
+        self._background_feed_update_tasks.discard(task)
+        self._slots.release()
+        Metrics.webhook_updates_in_flight.dec()
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Failed to handle update", exc_info=task.exception())
+
+    async def _drain(self, _app: web.Application) -> None:
+        self._draining = True
+        tasks = set(self._background_feed_update_tasks)
+        if not tasks:
+            return
+        logger.info("Waiting for %s updates in progress", len(tasks))
+        _done, pending = await asyncio.wait(tasks, timeout=self._drain_timeout_sec)
+        if pending:
+            logger.warning("Cancelling %s updates still running after %ss", len(pending), self._drain_timeout_sec)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+def create_app(dispatcher: aiogram.Dispatcher, bot: aiogram.Bot, cfg: Settings) -> web.Application:
+    if not SECRET_TOKEN_PATTERN.match(cfg.WEBHOOK_SECRET):
+        raise ValueError("WEBHOOK_SECRET must be 1-256 characters of A-Z, a-z, 0-9, _ and -")
+
+    app = web.Application()
+    BoundedRequestHandler(
+        dispatcher=dispatcher,
+        bot=bot,
+        secret_token=cfg.WEBHOOK_SECRET,
+        max_concurrent_updates=cfg.WEBHOOK_MAX_CONCURRENT_UPDATES,
+        drain_timeout_sec=cfg.WEBHOOK_DRAIN_TIMEOUT_SEC,
+    ).register(app, path=cfg.WEBHOOK_PATH)
+
+    async def set_webhook(_app: web.Application) -> None:
+        # Every replica registers the same URL, so this is safe to repeat on each start.
+        # The webhook is kept on shutdown: other replicas are still serving it.
+        await bot.set_webhook(
+            url=cfg.WEBHOOK_URL,
+            secret_token=cfg.WEBHOOK_SECRET,
+            max_connections=cfg.WEBHOOK_MAX_CONNECTIONS,
+            allowed_updates=dispatcher.resolve_used_update_types(),
+        )
+        logger.info("Webhook set to %s", cfg.WEBHOOK_URL)
+
+    if cfg.WEBHOOK_URL:
+        app.on_startup.append(set_webhook)
+    setup_application(app, dispatcher, bot=bot)
+    return app
+
+
+def run_webhook(dispatcher: aiogram.Dispatcher, bot: aiogram.Bot, cfg: Settings) -> None:
+    web.run_app(
+        create_app(dispatcher, bot, cfg),
+        host=cfg.WEBHOOK_HOST,
+        port=cfg.WEBHOOK_PORT,
+        # Covers the drain plus flushing buffered messages
+        shutdown_timeout=cfg.WEBHOOK_DRAIN_TIMEOUT_SEC + 5,
+        access_log=None,
+    )
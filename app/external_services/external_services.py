@@ -1,5 +1,29 @@
+from app.external_services.base import BaseService
+from app.external_services.llm import LLMBackend, LLMGateway, OpenAIBackend, StubBackend, StubCompletionModel
 from app.external_services.postgresql import PostgreSQL
-from app.settings import get_settings
+from app.settings import Settings, get_settings
+
+
+def _make_llm_backend(config: Settings) -> LLMBackend:
+    if config.LLM_BACKEND == "stub":
+        return StubBackend(
+            StubCompletionModel(
+                latency_sec=config.LLM_STUB_LATENCY_SEC,
+                error_rate=config.LLM_STUB_ERROR_RATE,
+                tokens_per_sec=config.LLM_STUB_TOKENS_PER_SEC,
+            )
+        )
+    if config.LLM_BACKEND == "openai":
+        return OpenAIBackend(
+            api_key=config.OPENAI_API_KEY,
+            base_url=config.OPENAI_API_ENDPOINT,
+            max_connections=config.OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=config.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry_sec=config.OPENAI_KEEPALIVE_EXPIRY_SEC,
+            connect_timeout_sec=config.OPENAI_CONNECT_TIMEOUT_SEC,
+            timeout_sec=config.OPENAI_TIMEOUT_SEC,
+        )
+    raise ValueError(f"Unknown LLM_BACKEND: {config.LLM_BACKEND}")
 
 
 class ExternalServices:
@@ -14,4 +38,32 @@ class ExternalServices:
         echo_pool=config.POSTGRES_ECHO_POOL,
         pool_size=config.POSTGRES_POOL_SIZE,
         connection_retry_period_sec=config.POSTGRES_CONNECTION_RETRY_PERIOD_SEC,
+        max_overflow=config.POSTGRES_MAX_OVERFLOW,
+        pool_recycle_sec=config.POSTGRES_POOL_RECYCLE_SEC,
+        pool_timeout_sec=config.POSTGRES_POOL_TIMEOUT_SEC,
+        pool_pre_ping=config.POSTGRES_POOL_PRE_PING,
+        statement_timeout_ms=config.POSTGRES_STATEMENT_TIMEOUT_MS,
+    )
+
+    llm = LLMGateway(
+        backend=_make_llm_backend(config),
+        model=config.OPENAI_MODEL,
+        requests_per_minute=config.OPENAI_REQUESTS_PER_MINUTE,
+        tokens_per_minute=config.OPENAI_TOKENS_PER_MINUTE,
+        timeout_sec=config.OPENAI_TIMEOUT_SEC,
+        max_retries=config.OPENAI_MAX_RETRIES,
     )
+
+    @classmethod
+    def all(cls) -> list[BaseService]:
+        return [cls.database, cls.llm]
+
+    @classmethod
+    async def start(cls) -> None:
+        for service in cls.all():
+            await service.start()
+
+    @classmethod
+    async def stop(cls) -> None:
+        for service in reversed(cls.all()):
+            await service.stop()
@@ -0,0 +1,2 @@
+from app.external_services.llm.backends import LLMBackend, LLMCompletion, OpenAIBackend, StubBackend, StubCompletionModel
+from app.external_services.llm.llm import LLMGateway
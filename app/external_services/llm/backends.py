@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import asyncio
+import random
+from dataclasses import dataclass
+from typing import Protocol, Sequence
+
+import httpx
+import openai
+from openai import AsyncOpenAI
+from openai.types.chat import ChatCompletionMessageParam
+
+from app.external_services.llm.exceptions import LLMException, LLMRetryableException
+
+
+__all__ = ["LLMBackend", "LLMCompletion", "OpenAIBackend", "StubBackend", "StubCompletionModel"]
+
+
+@dataclass(slots=True)
+class LLMCompletion:
+    content: str
+    # Usage as reported by the API, None when it isn't
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+
+
+class LLMBackend(Protocol):
+    async def chat(
+        self, model: str, messages: Sequence[ChatCompletionMessageParam], max_tokens: int, timeout_sec: float
+    ) -> LLMCompletion:
+        """Run a single completion attempt"""
+
+    async def close(self) -> None:
+        """Release connections"""
+
+
+class OpenAIBackend:
+    """OpenAI or any OpenAI-compatible API (including the stub server) over one pooled httpx client"""
+
+    RETRYABLE_EXCEPTIONS = (
+        openai.RateLimitError,
+        openai.InternalServerError,
+        openai.APIConnectionError,  # includes APITimeoutError
+    )
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry_sec: float = 30,
+        connect_timeout_sec: float = 5,
+        timeout_sec: float = 60,
+    ):
+        self._api_key = api_key
+        self._base_url = base_url
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry_sec,
+        )
+        self._timeout = httpx.Timeout(timeout_sec, connect=connect_timeout_sec)
+        self._http_client: httpx.AsyncClient | None = None
+        self._client: AsyncOpenAI | None = None
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """Created on first use, inside the event loop that will use it"""
+        if self._client is None:
+            self._http_client = httpx.AsyncClient(limits=self._limits, timeout=self._timeout)
+            self._client = AsyncOpenAI(
+                api_key=self._api_key,
+                base_url=self._base_url,
+                http_client=self._http_client,
+                max_retries=0,  # retried by LLMGateway, with the shared budgets
+            )
+        return self._client
+
+    async def chat(
+        self, model: str, messages: Sequence[ChatCompletionMessageParam], max_tokens: int, timeout_sec: float
+    ) -> LLMCompletion:
+        try:
+            resp = await self.client.chat.completions.create(
+                model=model,
+                max_tokens=max_tokens,
+                messages=list(messages),
+                timeout=timeout_sec,
+            )
+        except self.RETRYABLE_EXCEPTIONS as exc:
+            raise LLMRetryableException(str(exc)) from exc
+        except openai.OpenAIError as exc:
+            raise LLMException(str(exc)) from exc
+        return LLMCompletion(
+            content=resp.choices[0].message.content or "",
+            prompt_tokens=resp.usage.prompt_tokens if resp.usage else None,
+            completion_tokens=resp.usage.completion_tokens if resp.usage else None,
+        )
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+            self._http_client = None
+
+
+class StubCompletionModel:
+    """
+    Imitates a completion API: waits ``latency_sec`` plus the time to produce the completion at
+    ``tokens_per_sec``, fails ``error_rate`` of the requests and answers with filler text.
+    Shared by :class:`StubBackend` and the stub server.
+    """
+
+    WORDS = ("summary", "chat", "topic", "decision", "update", "question", "answer", "plan", "note", "result")
+    COMPLETION_SHARE = 0.5  # of max_tokens produced by each completion
+
+    def __init__(self, latency_sec: float = 0.2, error_rate: float = 0.0, tokens_per_sec: float = 0, seed: int | None = None):
+        self._latency_sec = latency_sec
+        self._error_rate = error_rate
+        self._tokens_per_sec = tokens_per_sec
+        self._random = random.Random(seed)
+
+    def should_fail(self) -> bool:
+        return self._random.random() < self._error_rate
+
+    def completion_tokens(self, max_tokens: int) -> int:
+        return max(1, int(max_tokens * self.COMPLETION_SHARE))
+
+    def delay_sec(self, completion_tokens: int) -> float:
+        if self._tokens_per_sec <= 0:
+            return self._latency_sec
+        return self._latency_sec + completion_tokens / self._tokens_per_sec
+
+    def text(self, completion_tokens: int) -> str:
+        return " ".join(self._random.choice(self.WORDS) for _ in range(completion_tokens))
+
+    async def complete(self, max_tokens: int) -> LLMCompletion:
+        tokens = self.completion_tokens(max_tokens)
+        await asyncio.sleep(self.delay_sec(tokens))
+        if self.should_fail():
+            raise LLMRetryableException("Simulated server error")
+        return LLMCompletion(content=self.text(tokens), completion_tokens=tokens)
+
+
+class StubBackend:
+    """In-process stand-in for the API, for load tests without network access"""
+
+    def __init__(self, model: StubCompletionModel):
+        self._model = model
+
+    async def chat(
+        self, model: str, messages: Sequence[ChatCompletionMessageParam], max_tokens: int, timeout_sec: float
+    ) -> LLMCompletion:
+        try:
+            return await asyncio.wait_for(self._model.complete(max_tokens), timeout_sec)
+        except asyncio.TimeoutError as exc:
+            raise LLMRetryableException("Request timed out") from exc
+
+    async def close(self) -> None:
+        pass
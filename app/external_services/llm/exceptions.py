@@ -0,0 +1,6 @@
+class LLMException(Exception):
+    pass
+
+
+class LLMRetryableException(LLMException):
+    """Rate limiting, server errors and connection problems, worth another attempt"""
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import logging
+import time
+from typing import Sequence
+
+from openai.types.chat import ChatCompletionMessageParam
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+
+from app.external_services.base import BaseService
+from app.external_services.llm.backends import LLMBackend, LLMCompletion
+from app.external_services.llm.exceptions import LLMRetryableException
+from app.external_services.rate_limiter import TokenBucket
+from app.metrics.metrics import Metrics
+
+
+__all__ = ["LLMGateway"]
+
+
+logger = logging.getLogger(__name__)
+
+
+def _log_retry(retry_state) -> None:
+    logger.warning(
+        "LLM request failed (attempt %s), retrying in %.1fs: %s",
+        retry_state.attempt_number,
+        retry_state.next_action.sleep,
+        retry_state.outcome.exception(),
+    )
+
+
+def _prompt_chars(messages: Sequence[ChatCompletionMessageParam]) -> int:
+    # Only text content is sent by the bot
+    return sum(len(content) for message in messages if isinstance(content := message.get("content"), str))
+
+
+class LLMGateway(BaseService):
+    """
+    Single entry point for chat completions shared by every AI workload
+    - the backend (see backends.py) is chosen by LLM_BACKEND; the OpenAI one keeps a single
+      httpx connection pool with keep-alive, so connections are reused across callers
+    - global request (RPM) and token (TPM) budgets
+    - retries of 429, 5xx and connection errors with jittered exponential backoff
+    - a timeout for every call
+    """
+
+    CHARS_PER_TOKEN = 3  # conservative prompt size estimate for the token budget
+
+    def __init__(
+        self,
+        backend: LLMBackend,
+        model: str,
+        requests_per_minute: int = 500,
+        tokens_per_minute: int = 0,
+        timeout_sec: float = 60,
+        max_retries: int = 4,
+    ):
+        super().__init__()
+        self._backend = backend
+        self.model = model
+        self._timeout_sec = timeout_sec
+        self._max_retries = max_retries
+        self._request_limiter = TokenBucket.per_minute(requests_per_minute) if requests_per_minute > 0 else None
+        # A whole minute of tokens may be spent at once, a single prompt is often larger than a second's share
+        self._token_limiter = (
+            TokenBucket(rate=tokens_per_minute / 60, capacity=tokens_per_minute) if tokens_per_minute > 0 else None
+        )
+
+    @property
+    def backend(self) -> LLMBackend:
+        return self._backend
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        await self._backend.close()
+
+    def _estimate_tokens(self, text_length: int) -> int:
+        return text_length // self.CHARS_PER_TOKEN + 1
+
+    async def _acquire(self, messages: Sequence[ChatCompletionMessageParam], max_tokens: int) -> None:
+        if self._request_limiter is not None:
+            await self._request_limiter.acquire()
+        if self._token_limiter is not None:
+            prompt_chars = _prompt_chars(messages)
+            await self._token_limiter.acquire(self._estimate_tokens(prompt_chars) + max_tokens)
+
+    async def _attempt(
+        self, messages: Sequence[ChatCompletionMessageParam], max_tokens: int, timeout_sec: float
+    ) -> LLMCompletion:
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            completion = await self._backend.chat(self.model, messages, max_tokens, timeout_sec)
+            outcome = "ok"
+        except LLMRetryableException:
+            outcome = "retryable_error"
+            raise
+        finally:
+            Metrics.llm_requests.inc(outcome=outcome)
+            Metrics.llm_request_seconds.observe(time.perf_counter() - started, outcome=outcome)
+
+        prompt_tokens = completion.prompt_tokens
+        if prompt_tokens is None:
+            prompt_tokens = self._estimate_tokens(_prompt_chars(messages))
+        completion_tokens = completion.completion_tokens
+        if completion_tokens is None:
+            completion_tokens = self._estimate_tokens(len(completion.content))
+        Metrics.llm_tokens.inc(prompt_tokens, kind="prompt")
+        Metrics.llm_tokens.inc(completion_tokens, kind="completion")
+        return completion
+
+    async def chat(
+        self, messages: Sequence[ChatCompletionMessageParam], max_tokens: int, timeout_sec: float | None = None
+    ) -> str:
+        """
+        Run a chat completion and return its stripped text
+        :param timeout_sec: overrides the default timeout of a single attempt
+        """
+        retrying = AsyncRetrying(
+            retry=retry_if_exception_type(LLMRetryableException),
+            wait=wait_random_exponential(multiplier=0.5, max=30),
+            stop=stop_after_attempt(self._max_retries + 1),
+            before_sleep=_log_retry,
+            reraise=True,
+        )
+        async for attempt in retrying:
+            with attempt:
+                # Every attempt spends the budget, retries included
+                await self._acquire(messages, max_tokens)
+                completion = await self._attempt(
+                    messages,
+                    max_tokens,
+                    timeout_sec if timeout_sec is not None else self._timeout_sec,
+                )
+        return completion.content.strip()
+
+    async def complete(
+        self, system_prompt: str, body: str, max_tokens: int, timeout_sec: float | None = None
+    ) -> str:
+        return await self.chat(
+            [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": body},
+            ],
+            max_tokens=max_tokens,
+            timeout_sec=timeout_sec,
+        )
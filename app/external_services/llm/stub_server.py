@@ -0,0 +1,91 @@
+"""
+OpenAI-compatible stand-in server for load tests without network access or API costs.
+
+    python -m app.external_services.llm.stub_server --port 8089 --latency-sec 0.5 --error-rate 0.05
+
+Point the bot at it with ``LLM_BACKEND=openai`` and ``OPENAI_API_ENDPOINT=http://localhost:8089/v1``.
+Defaults come from the LLM_STUB_* settings.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import time
+
+from aiohttp import web
+
+from app.external_services.llm.backends import StubCompletionModel
+from app.settings import get_settings
+
+
+__all__ = ["create_app"]
+
+
+def create_app(model: StubCompletionModel) -> web.Application:
+    ids = itertools.count(1)
+
+    async def chat_completions(request: web.Request) -> web.Response:
+        payload = await request.json()
+        max_tokens = int(payload.get("max_tokens") or payload.get("max_completion_tokens") or 256)
+        completion_tokens = model.completion_tokens(max_tokens)
+        await asyncio.sleep(model.delay_sec(completion_tokens))
+        if model.should_fail():
+            # Alternate between the two kinds of errors clients are expected to retry
+            status = 429 if next(ids) % 2 else 500
+            return web.json_response(
+                {"error": {"message": "Simulated error", "type": "server_error", "code": None}}, status=status
+            )
+        prompt_chars = sum(len(str(message.get("content") or "")) for message in payload.get("messages", []))
+        return web.json_response(
+            {
+                "id": f"chatcmpl-stub-{next(ids)}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model", "stub"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": model.text(completion_tokens)},
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_chars // 4,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_chars // 4 + completion_tokens,
+                },
+            }
+        )
+
+    async def models(_request: web.Request) -> web.Response:
+        return web.json_response({"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "stub"}]})
+
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_get("/v1/models", models)
+    return app
+
+
+def main() -> None:
+    cfg = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-sec", type=float, default=cfg.LLM_STUB_LATENCY_SEC)
+    parser.add_argument("--error-rate", type=float, default=cfg.LLM_STUB_ERROR_RATE)
+    parser.add_argument("--tokens-per-sec", type=float, default=cfg.LLM_STUB_TOKENS_PER_SEC)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    model = StubCompletionModel(
+        latency_sec=args.latency_sec,
+        error_rate=args.error_rate,
+        tokens_per_sec=args.tokens_per_sec,
+        seed=args.seed,
+    )
+    web.run_app(create_app(model), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,7 @@ __all__ = ["Database", "SessionHandler"]
 class Database(Protocol):
 
     @abstractmethod
-    def session(self) -> SessionHandler:
+    def session(self, read_only: bool = False, autocommit: bool = False) -> SessionHandler:
         """Session"""
 
     @abstractmethod
@@ -1,16 +1,19 @@
 import re
 import socket
+import time
 from contextlib import suppress
-from typing import Literal
+from typing import Callable, Literal, cast
 from urllib.parse import quote
 
+import asyncpg  # type: ignore[import-untyped]
 from psycopg2 import errorcodes
-from sqlalchemy import MetaData, Table, create_engine, text
+from sqlalchemy import text
 from sqlalchemy.exc import DatabaseError, DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine, engine
-from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import QueuePool
 
 from app.external_services.base import BaseService
+from app.metrics.metrics import Metrics
 from app.external_services.postgresql.base_database import Database
 from app.external_services.postgresql.exceptions import (
     DatabaseException,
@@ -41,18 +44,22 @@ class SessionHandler:
     !!! Warning: hardcoded always try to commit when errors not handled
 
     :param session(AsyncSession): managed session must be passed from outside
+    :param commit: commit on exit; sessions that never write (read-only or autocommit ones)
+        are just closed, without a COMMIT round trip
 
     """
 
-    def __init__(
-        self, async_session: AsyncSession = None, sync_session: Session = None
-    ):  # pylint:disable=redefined-outer-name
-        self._is_async = async_session is not None
-        self.session = async_session or sync_session
+    def __init__(self, async_session: AsyncSession, commit: bool = True):
+        self._commit = commit
+        self.session = async_session
 
     async def __aenter__(self) -> AsyncSession:
-        assert self._is_async, "This is sync session!"
-        await self.session.begin()
+        started = time.perf_counter()
+        if self._commit:
+            await self.session.begin()
+        # Check out the connection now, so waiting for the pool is measured on its own
+        await self.session.connection()
+        Metrics.db_session_acquire_seconds.observe(time.perf_counter() - started)
         return self.session
 
     async def __aexit__(self, exception_type: type, exception: Exception, _traceback) -> None:
@@ -66,6 +73,11 @@ class SessionHandler:
             else:
                 raise exception_type(exception) from exception
 
+        if not self._commit:
+            with suppress(Exception):
+                await self.session.close()
+            return
+
         try:
             await self.session.commit()
         except DatabaseError as ex:
@@ -78,33 +90,6 @@ class SessionHandler:
             with suppress(Exception):
                 await self.session.close()
 
-    def __enter__(self) -> Session:
-        assert not self._is_async, "This is async session!"
-        self.session.begin()
-        return self.session
-
-    def __exit__(self, exception_type: type, exception: Exception, _traceback) -> None:
-        if exception_type:
-            self.session.rollback()
-            self.session.close()
-
-            if issubclass(exception_type, DatabaseError) or issubclass(exception_type, DBAPIError):
-                raise self._create_strict_db_exception(exception) from exception  # type: ignore
-            else:
-                raise exception_type(exception) from exception
-
-        try:
-            self.session.commit()
-        except DatabaseError as ex:
-            self.session.rollback()
-            raise self._create_strict_db_exception(ex) from ex
-        except Exception as ex:
-            self.session.rollback()
-            raise ex
-        finally:
-            with suppress(Exception):
-                self.session.close()
-
     @staticmethod
     def _create_strict_db_exception(
         common_exception: DatabaseError,
@@ -119,10 +104,9 @@ class SessionHandler:
 class PostgreSQL(BaseService, Database):  # pylint: disable=too-many-instance-attributes
     """
     Implementing a PostgreSQL database
-    - loading table metadata from the database (_prepare_metadata)
-    - preparation of objects for group insertion (_prepare_objects)
-    - perform bulk insert (bulk_create)
-    - when receiving metadata, they are stored in the dictionary, for caching (_fetched_tables)
+    - the engine and its pool are created on first use (or by start), not on import
+    - read-write, read-only and autocommit sessions share one pool
+    - stop disposes of the pool
     """
 
     _username: str
@@ -133,21 +117,17 @@ class PostgreSQL(BaseService, Database):  # pylint: disable=too-many-instance-at
     _echo_pool: Literal["debug"] | bool
     _pool_size: int
     _connection_retry_period_sec: float
+    _max_overflow: int
+    _pool_recycle_sec: int
+    _pool_timeout_sec: float
+    _pool_pre_ping: bool
+    _statement_timeout_ms: int
 
-    _async_engine: engine.AsyncEngine
-    _sync_engine: engine.Engine
-
-    _metadata: MetaData
+    _async_engine: engine.AsyncEngine | None
 
     _async_session_maker: async_sessionmaker[AsyncSession]
-    _sync_session_maker: sessionmaker[Session]
-
-    _fetched_tables: dict[str, Table]
-
-    _async_session: AsyncSession
-    _sync_session: Session
-
-    _autocommit: bool
+    _read_only_session_maker: async_sessionmaker[AsyncSession]
+    _autocommit_session_maker: async_sessionmaker[AsyncSession]
 
     def __init__(
         self,
@@ -159,6 +139,11 @@ class PostgreSQL(BaseService, Database):  # pylint: disable=too-many-instance-at
         echo_pool: Literal["debug"] | bool = False,
         pool_size: int = 10,
         connection_retry_period_sec: float = 5,
+        max_overflow: int = 10,
+        pool_recycle_sec: int = 1800,
+        pool_timeout_sec: float = 30,
+        pool_pre_ping: bool = False,
+        statement_timeout_ms: int = 0,
     ):
         """
         Initialize settings
@@ -173,15 +158,18 @@ class PostgreSQL(BaseService, Database):  # pylint: disable=too-many-instance-at
         self._echo_pool = echo_pool
         self._pool_size = pool_size
         self._connection_retry_period_sec = connection_retry_period_sec
-        self._fetched_tables = {}
-        self._metadata = MetaData()
-        self._base = declarative_base(metadata=self._metadata)
-        self._autocommit = True
-
-        self.connect()
+        self._max_overflow = max_overflow
+        self._pool_recycle_sec = pool_recycle_sec
+        self._pool_timeout_sec = pool_timeout_sec
+        self._pool_pre_ping = pool_pre_ping
+        self._statement_timeout_ms = statement_timeout_ms
+        self._async_engine = None
 
     @property
     def engine(self) -> engine.AsyncEngine:
+        self.connect()
+        if self._async_engine is None:
+            raise DatabaseException("Database engine could not be created")
         return self._async_engine
 
     def _async_make_url(self) -> str:
@@ -191,59 +179,96 @@ class PostgreSQL(BaseService, Database):  # pylint: disable=too-many-instance-at
             f"{quote(self._password)}@{self._host}:{self._port}/{self._database}"
         )
 
-    def _sync_make_url(self) -> str:
-        """An example of a private method for generating a connection string"""
-        return (
-            f"postgresql://{quote(self._username)}:"
-            f"{quote(self._password)}@{self._host}:{self._port}/{self._database}"
-        )
-
     def connect(self) -> None:
-        """Database connecting"""
-
+        """Create the engine; connections are opened by the pool when sessions need them"""
+        if self._async_engine is not None:
+            return
         try:
+            server_settings = {}
+            if self._statement_timeout_ms > 0:
+                server_settings["statement_timeout"] = str(self._statement_timeout_ms)
             self._async_engine = create_async_engine(
                 url=self._async_make_url(),
                 pool_size=self._pool_size,
+                max_overflow=self._max_overflow,
+                # Connections are replaced before servers or proxies drop them as idle,
+                # which makes a pre-ping round trip on every checkout unnecessary
+                pool_recycle=self._pool_recycle_sec,
+                pool_timeout=self._pool_timeout_sec,
+                pool_pre_ping=self._pool_pre_ping,
                 echo_pool=self._echo_pool,
-                pool_pre_ping=True,
                 connect_args={
-                    "server_settings": {
-                        # "statement_timeout": "20000",
-                    },
+                    "server_settings": server_settings,
                 },
             )
-            self._sync_engine = create_engine(
-                url=self._sync_make_url(),
-                pool_size=self._pool_size,
-                echo_pool=self._echo_pool,
-                pool_pre_ping=True,
-            )
+
+            pool = cast(QueuePool, self._async_engine.sync_engine.pool)
+            Metrics.db_pool_connections.set_function(pool.checkedout, state="checked_out")
+            Metrics.db_pool_connections.set_function(pool.checkedin, state="idle")
+            Metrics.db_pool_connections.set_function(lambda: max(pool.overflow(), 0), state="overflow")
 
             self._async_session_maker = async_sessionmaker(bind=self._async_engine, expire_on_commit=False)
-            self._sync_session_maker = sessionmaker(bind=self._sync_engine, expire_on_commit=False)
+            # All queries of a read-only session see one snapshot, and writes are refused
+            self._read_only_session_maker = async_sessionmaker(
+                bind=self._async_engine.execution_options(
+                    isolation_level="REPEATABLE READ", postgresql_readonly=True
+                ),
+                expire_on_commit=False,
+            )
+            # Never sends BEGIN/COMMIT; every statement is committed on its own
+            self._autocommit_session_maker = async_sessionmaker(
+                bind=self._async_engine.execution_options(isolation_level="AUTOCOMMIT"), expire_on_commit=False
+            )
         except socket.gaierror:
             raise
 
-    def session(self) -> SessionHandler:
-        """Create an intermediate async session"""
+    def session(self, read_only: bool = False, autocommit: bool = False) -> SessionHandler:
+        """
+        Create an intermediate async session
+        :param read_only: one read-only REPEATABLE READ transaction, so several queries are
+            consistent with each other; rolled back on exit
+        :param autocommit: no transaction at all, every statement is committed on its own;
+            the cheapest way to run a single query, and needed for statements that can't run
+            in a transaction block (e.g. DETACH PARTITION ... CONCURRENTLY)
+        """
+        self.connect()
+        if read_only and autocommit:
+            raise ValueError("A session is either read-only or autocommit")
+        if read_only:
+            return SessionHandler(async_session=self._read_only_session_maker(), commit=False)
+        if autocommit:
+            return SessionHandler(async_session=self._autocommit_session_maker(), commit=False)
         return SessionHandler(async_session=self._async_session_maker())
 
-    def sync_session(self) -> SessionHandler:
-        """Create an intermediate sync session"""
-        return SessionHandler(sync_session=self._sync_session_maker())
+    async def listen(self, channel: str, callback: Callable[[str], None]) -> asyncpg.Connection:
+        """
+        Open a dedicated connection that LISTENs on *channel*
+        :param callback: called with the payload of every notification
+        :return: the connection, the caller is responsible for closing it
+        """
+        connection = await asyncpg.connect(
+            user=self._username,
+            password=self._password,
+            host=self._host,
+            port=self._port,
+            database=self._database,
+        )
+        await connection.add_listener(channel, lambda _connection, _pid, _channel, payload: callback(payload))
+        return connection
 
     async def start(self):
         """
         Run actions for starting a service
         """
-        pass
+        self.connect()
 
     async def stop(self):
         """
         Run actions for stopping a service
         """
-        pass
+        if self._async_engine is not None:
+            await self._async_engine.dispose()
+            self._async_engine = None
 
     async def healthcheck(self) -> tuple[bool, str]:
         try:
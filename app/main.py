@@ -1,10 +1,17 @@
 from app.bot.bot import BOT
 from app.bot.dispatcher import dispatcher
+from app.bot.webhook import run_webhook
+from app.settings import get_settings
 import asyncio
 
 async def main():
+    # getUpdates is refused while a webhook is registered
+    await BOT.delete_webhook()
     await dispatcher.start_polling(BOT)
 
 if __name__ == "__main__":
-    asyncio.run(main())
-
+    config = get_settings()
+    if config.BOT_MODE == "webhook":
+        run_webhook(dispatcher, BOT, config)
+    else:
+        asyncio.run(main())
@@ -0,0 +1,5 @@
+# Metric definitions come first: external services record metrics and are imported by the server module
+from app.metrics.metrics import REGISTRY, Metrics
+from app.metrics.server import MetricsServer
+
+__all__ = ["Metrics", "MetricsServer", "REGISTRY"]
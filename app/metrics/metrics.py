@@ -0,0 +1,89 @@
+from app.metrics.registry import Counter, Gauge, Histogram, Registry
+
+__all__ = ["Metrics", "REGISTRY"]
+
+REGISTRY = Registry()
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+LAG_BUCKETS = (1, 5, 15, 30, 60, 300, 900, 1800, 3600, 4 * 3600, 24 * 3600)
+
+
+class Metrics:
+    # Message ingestion (bot)
+    messages_ingested = Counter(
+        "bot_messages_ingested_total", "Chat messages accepted for storage", ["mode"], registry=REGISTRY
+    )
+    message_handle_seconds = Histogram(
+        "bot_message_handle_seconds", "Time a handler spends storing or queueing a message", ["mode"],
+        buckets=LATENCY_BUCKETS, registry=REGISTRY,
+    )
+    webhook_updates_in_flight = Gauge(
+        "bot_webhook_updates_in_flight", "Webhook updates being handled", registry=REGISTRY
+    )
+    ingest_queue_depth = Gauge(
+        "ingest_queue_depth", "Messages waiting in the ingestion queue", registry=REGISTRY
+    )
+    ingest_batch_size = Histogram(
+        "ingest_batch_size", "Messages written per batch", buckets=(1, 10, 50, 100, 250, 500, 1000, 2500),
+        registry=REGISTRY,
+    )
+    ingest_flush_seconds = Histogram(
+        "ingest_flush_seconds", "Time to write one batch of messages", buckets=LATENCY_BUCKETS, registry=REGISTRY
+    )
+    ingest_failed_messages = Counter(
+        "ingest_failed_messages_total", "Messages that could not be stored", registry=REGISTRY
+    )
+
+    # Database
+    db_session_acquire_seconds = Histogram(
+        "db_session_acquire_seconds", "Time to get a pooled connection for a session",
+        buckets=LATENCY_BUCKETS, registry=REGISTRY,
+    )
+    db_pool_connections = Gauge(
+        "db_pool_connections", "Connections of the engine pool by state", ["state"], registry=REGISTRY
+    )
+
+    # LLM
+    llm_requests = Counter(
+        "llm_requests_total", "Completion attempts by outcome", ["outcome"], registry=REGISTRY
+    )
+    llm_request_seconds = Histogram(
+        "llm_request_seconds", "Duration of completion attempts", ["outcome"], buckets=LLM_BUCKETS, registry=REGISTRY
+    )
+    llm_tokens = Counter(
+        "llm_tokens_total", "Tokens reported by the API (estimated when it doesn't)", ["kind"], registry=REGISTRY
+    )
+
+    # Documents (analysis daemon)
+    documents_by_status = Gauge(
+        "documents_by_status", "Stored documents by processing_status", ["status"], registry=REGISTRY
+    )
+    document_pipeline_queue_depth = Gauge(
+        "document_pipeline_queue_depth", "Documents waiting for a pipeline stage", ["stage"], registry=REGISTRY
+    )
+    documents_processed = Counter(
+        "documents_processed_total", "Documents finished by the processor by outcome", ["outcome"], registry=REGISTRY
+    )
+
+    # Telegram delivery (analysis daemon)
+    telegram_sends = Counter(
+        "telegram_sends_total", "Bot message send attempts by outcome", ["outcome"], registry=REGISTRY
+    )
+
+    # Messages partitions (analysis daemon)
+    messages_partitions_dropped = Counter(
+        "messages_partitions_dropped_total", "Expired messages partitions by drop outcome", ["outcome"],
+        registry=REGISTRY,
+    )
+
+    # Digests (analysis daemon)
+    digests = Counter("digests_total", "Digest runs by outcome", ["outcome"], registry=REGISTRY)
+    digest_lag_seconds = Histogram(
+        "digest_lag_seconds", "Delay between a digest's scheduled time and its delivery",
+        buckets=LAG_BUCKETS, registry=REGISTRY,
+    )
+    digest_schedule_lag_seconds = Gauge(
+        "digest_schedule_lag_seconds", "How long the most overdue unclaimed digest has been waiting",
+        registry=REGISTRY,
+    )
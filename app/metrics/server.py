@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import logging
+
+from aiohttp import web
+
+from app.external_services.base import BaseService
+from app.metrics.registry import Registry
+
+
+__all__ = ["MetricsServer"]
+
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsServer(BaseService):
+    """Serves the registry at ``GET /metrics`` for Prometheus to scrape"""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self, registry: Registry, host: str = "0.0.0.0", port: int = 0):
+        super().__init__()
+        self._registry = registry
+        self._host = host
+        self._port = port
+        self._runner: web.AppRunner | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._port > 0
+
+    async def _metrics(self, _request: web.Request) -> web.Response:
+        return web.Response(body=self._registry.render().encode(), headers={"Content-Type": self.CONTENT_TYPE})
+
+    async def start(self) -> None:
+        if not self.enabled or self._runner is not None:
+            return
+        app = web.Application()
+        app.router.add_get("/metrics", self._metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self._host, self._port).start()
+        logger.info("Serving metrics on http://%s:%s/metrics", self._host, self._port)
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,100 @@
+"""partition messages by sent_at
+
+Revision ID: 5d1f2a8c9b34
+Revises: 2597847f8a5c
+Create Date: 2026-10-18 09:00:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d1f2a8c9b34'
+down_revision: Union[str, None] = '2597847f8a5c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+MESSAGE_COLUMNS = "id, chat_id, sender_user_id, message_text, message_type, sent_at, created_at, updated_at, deleted_at"
+
+
+def _message_columns() -> list[sa.schema.SchemaItem]:
+    return [
+        sa.Column('id', sa.BigInteger(), server_default=sa.text("nextval('messages_id_seq'::regclass)"), nullable=False),
+        sa.Column('chat_id', sa.BigInteger(), nullable=False),
+        sa.Column('sender_user_id', sa.BigInteger(), nullable=False),
+        sa.Column('message_text', sa.Text(), nullable=True),
+        sa.Column('message_type', sa.String(length=50), nullable=False),
+        sa.Column('sent_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['chat_id'], ['chats.id'], ),
+        sa.ForeignKeyConstraint(['sender_user_id'], ['users.id'], ),
+    ]
+
+
+def upgrade() -> None:
+    # A partitioned table can only be unique on columns that include the partition key,
+    # so documents can no longer reference messages.id with a foreign key.
+    op.drop_constraint(op.f('documents_message_fk_fkey'), 'documents', type_='foreignkey')
+    op.create_index('ix_documents_message_fk', 'documents', ['message_fk'])
+
+    op.execute("ALTER TABLE messages RENAME TO messages_legacy")
+    op.execute("ALTER TABLE messages_legacy RENAME CONSTRAINT messages_pkey TO messages_legacy_pkey")
+    op.execute("ALTER SEQUENCE messages_id_seq OWNED BY NONE")
+
+    op.create_table('messages',
+    *_message_columns(),
+    sa.PrimaryKeyConstraint('id', 'sent_at'),
+    postgresql_partition_by='RANGE (sent_at)',
+    )
+    op.execute("CREATE TABLE messages_default PARTITION OF messages DEFAULT")
+    # Monthly partitions covering the existing history plus two months ahead;
+    # app/ai_analysis/partition_maintenance.py keeps creating them from here on.
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            month_start date := date_trunc('month', coalesce((SELECT min(sent_at) FROM messages_legacy), now()));
+            last_month date := date_trunc('month', now()) + interval '2 months';
+        BEGIN
+            WHILE month_start <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE IF NOT EXISTS %I PARTITION OF messages FOR VALUES FROM (%L) TO (%L)',
+                    'messages_' || to_char(month_start, '"y"YYYY"m"MM'),
+                    month_start,
+                    month_start + interval '1 month'
+                );
+                month_start := month_start + interval '1 month';
+            END LOOP;
+        END $$;
+        """
+    )
+
+    op.execute(f"INSERT INTO messages ({MESSAGE_COLUMNS}) SELECT {MESSAGE_COLUMNS} FROM messages_legacy")
+    op.drop_table('messages_legacy')
+    op.execute("ALTER SEQUENCE messages_id_seq OWNED BY messages.id")
+
+    op.create_index('ix_messages_chat_id_sent_at', 'messages', ['chat_id', 'sent_at'], postgresql_include=['id'])
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE messages RENAME TO messages_partitioned")
+    op.execute("ALTER TABLE messages_partitioned RENAME CONSTRAINT messages_pkey TO messages_partitioned_pkey")
+    op.execute("ALTER SEQUENCE messages_id_seq OWNED BY NONE")
+
+    op.create_table('messages',
+    *_message_columns(),
+    sa.PrimaryKeyConstraint('id', name='messages_pkey'),
+    )
+    op.execute(f"INSERT INTO messages ({MESSAGE_COLUMNS}) SELECT {MESSAGE_COLUMNS} FROM messages_partitioned")
+    # Dropping the parent drops every partition with it
+    op.drop_table('messages_partitioned')
+    op.execute("ALTER SEQUENCE messages_id_seq OWNED BY messages.id")
+
+    op.drop_index('ix_documents_message_fk', table_name='documents')
+    op.create_foreign_key(op.f('documents_message_fk_fkey'), 'documents', 'messages', ['message_fk'], ['id'])
@@ -0,0 +1,32 @@
+"""add documents claim lease
+
+Revision ID: 8e3b7c41d2a6
+Revises: 5d1f2a8c9b34
+Create Date: 2026-10-18 09:30:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e3b7c41d2a6'
+down_revision: Union[str, None] = '5d1f2a8c9b34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('claimed_by', sa.String(length=255), nullable=True))
+    op.add_column('documents', sa.Column('lease_expires_at', sa.DateTime(), nullable=True))
+    op.add_column('documents', sa.Column('processing_attempts', sa.Integer(), server_default='0', nullable=False))
+    op.create_index('ix_documents_processing_status_lease_expires_at', 'documents', ['processing_status', 'lease_expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_documents_processing_status_lease_expires_at', table_name='documents')
+    op.drop_column('documents', 'processing_attempts')
+    op.drop_column('documents', 'lease_expires_at')
+    op.drop_column('documents', 'claimed_by')
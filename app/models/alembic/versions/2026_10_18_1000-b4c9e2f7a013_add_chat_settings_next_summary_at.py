@@ -0,0 +1,50 @@
+"""add chat_settings next_summary_at
+
+Revision ID: b4c9e2f7a013
+Revises: 8e3b7c41d2a6
+Create Date: 2026-10-18 10:00:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.settings import get_settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4c9e2f7a013'
+down_revision: Union[str, None] = '8e3b7c41d2a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing chats keep getting their digest in the zone the bot is configured with
+    op.add_column(
+        'chat_settings',
+        sa.Column('timezone', sa.String(length=64), server_default=get_settings().TIMEZONE, nullable=False),
+    )
+    op.alter_column('chat_settings', 'timezone', existing_type=sa.String(length=64), server_default='UTC')
+    op.add_column('chat_settings', sa.Column('next_summary_at', sa.DateTime(), nullable=True))
+    op.add_column('chat_settings', sa.Column('summary_lease_expires_at', sa.DateTime(), nullable=True))
+    # Next local occurrence of summary_time, stored as naive UTC
+    op.execute(
+        """
+        UPDATE chat_settings SET next_summary_at = CASE
+            WHEN ((date(now() AT TIME ZONE timezone) + summary_time) AT TIME ZONE timezone) > now()
+            THEN ((date(now() AT TIME ZONE timezone) + summary_time) AT TIME ZONE timezone) AT TIME ZONE 'UTC'
+            ELSE ((date(now() AT TIME ZONE timezone) + 1 + summary_time) AT TIME ZONE timezone) AT TIME ZONE 'UTC'
+        END
+        """
+    )
+    op.alter_column('chat_settings', 'next_summary_at', existing_type=sa.DateTime(), nullable=False)
+    op.create_index(op.f('ix_chat_settings_next_summary_at'), 'chat_settings', ['next_summary_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_chat_settings_next_summary_at'), table_name='chat_settings')
+    op.drop_column('chat_settings', 'summary_lease_expires_at')
+    op.drop_column('chat_settings', 'next_summary_at')
+    op.drop_column('chat_settings', 'timezone')
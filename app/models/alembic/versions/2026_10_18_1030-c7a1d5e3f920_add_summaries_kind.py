@@ -0,0 +1,28 @@
+"""add summaries kind
+
+Revision ID: c7a1d5e3f920
+Revises: b4c9e2f7a013
+Create Date: 2026-10-18 10:30:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7a1d5e3f920'
+down_revision: Union[str, None] = 'b4c9e2f7a013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('summaries', sa.Column('kind', sa.String(length=20), server_default='daily', nullable=False))
+    op.create_index('uq_summaries_partial_chat_id_until', 'summaries', ['chat_id', 'messages_until_time'], unique=True, postgresql_where=sa.text("kind = 'partial'"))
+
+
+def downgrade() -> None:
+    op.drop_index('uq_summaries_partial_chat_id_until', table_name='summaries', postgresql_where=sa.text("kind = 'partial'"))
+    op.drop_column('summaries', 'kind')
@@ -0,0 +1,35 @@
+"""add document summary cache
+
+Revision ID: d2e8f4a6b157
+Revises: c7a1d5e3f920
+Create Date: 2026-10-18 11:00:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2e8f4a6b157'
+down_revision: Union[str, None] = 'c7a1d5e3f920'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('document_summary_cache',
+    sa.Column('cache_key', sa.String(length=255), nullable=False),
+    sa.Column('summary', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('cache_key')
+    )
+    op.add_column('documents', sa.Column('telegram_file_unique_id', sa.String(length=255), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('documents', 'telegram_file_unique_id')
+    op.drop_table('document_summary_cache')
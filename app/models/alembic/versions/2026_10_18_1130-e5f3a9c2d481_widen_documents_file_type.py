@@ -0,0 +1,54 @@
+"""widen documents file_type
+
+Revision ID: e5f3a9c2d481
+Revises: d2e8f4a6b157
+Create Date: 2026-10-18 11:30:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f3a9c2d481'
+down_revision: Union[str, None] = 'd2e8f4a6b157'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Types with an extractor in app/ai_analysis/extraction.py at the time of this migration
+SUPPORTED_FILE_TYPES = (
+    'application/pdf',
+    'application/epub+zip',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'application/xhtml+xml',
+    'text/csv',
+    'text/html',
+    'text/markdown',
+    'text/plain',
+    'text/x-markdown',
+)
+
+
+def upgrade() -> None:
+    # The DOCX mime type alone is 71 characters long
+    op.alter_column('documents', 'file_type',
+               existing_type=sa.String(length=50),
+               type_=sa.String(length=255),
+               existing_nullable=True)
+    supported = ", ".join(f"'{file_type}'" for file_type in SUPPORTED_FILE_TYPES)
+    op.execute(
+        "UPDATE documents SET processing_status = 'unsupported' "
+        "WHERE processing_status = 'not_started' "
+        f"AND (file_type IS NULL OR split_part(lower(file_type), ';', 1) NOT IN ({supported}))"
+    )
+
+def downgrade() -> None:
+    op.execute("UPDATE documents SET processing_status = 'error' WHERE processing_status = 'unsupported'")
+    op.alter_column('documents', 'file_type',
+               existing_type=sa.String(length=255),
+               type_=sa.String(length=50),
+               existing_nullable=True,
+               postgresql_using='left(file_type, 50)')
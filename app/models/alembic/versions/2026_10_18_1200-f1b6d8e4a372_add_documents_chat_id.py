@@ -0,0 +1,29 @@
+"""add documents chat_id
+
+Revision ID: f1b6d8e4a372
+Revises: e5f3a9c2d481
+Create Date: 2026-10-18 12:00:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b6d8e4a372'
+down_revision: Union[str, None] = 'e5f3a9c2d481'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('chat_id', sa.BigInteger(), nullable=True))
+    op.execute("UPDATE documents SET chat_id = messages.chat_id FROM messages WHERE messages.id = documents.message_fk")
+    op.create_index('ix_documents_chat_id_analysis_started_at', 'documents', ['chat_id', 'analysis_started_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_documents_chat_id_analysis_started_at', table_name='documents')
+    op.drop_column('documents', 'chat_id')
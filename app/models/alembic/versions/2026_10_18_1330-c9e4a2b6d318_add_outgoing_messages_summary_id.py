@@ -0,0 +1,32 @@
+"""add outgoing messages summary_id
+
+Revision ID: c9e4a2b6d318
+Revises: b7d2f9a4c015
+Create Date: 2026-10-18 13:30:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9e4a2b6d318'
+down_revision: Union[str, None] = 'b7d2f9a4c015'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('outgoing_messages', sa.Column('summary_id', sa.UUID(), nullable=True))
+    op.add_column('outgoing_messages', sa.Column('scheduled_at', sa.DateTime(), nullable=True))
+    op.create_unique_constraint(op.f('outgoing_messages_summary_id_key'), 'outgoing_messages', ['summary_id'])
+    op.create_foreign_key(op.f('outgoing_messages_summary_id_fkey'), 'outgoing_messages', 'summaries', ['summary_id'], ['id'])
+
+
+def downgrade() -> None:
+    op.drop_constraint(op.f('outgoing_messages_summary_id_fkey'), 'outgoing_messages', type_='foreignkey')
+    op.drop_constraint(op.f('outgoing_messages_summary_id_key'), 'outgoing_messages', type_='unique')
+    op.drop_column('outgoing_messages', 'scheduled_at')
+    op.drop_column('outgoing_messages', 'summary_id')
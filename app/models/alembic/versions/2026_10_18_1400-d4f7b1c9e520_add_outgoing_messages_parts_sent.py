@@ -0,0 +1,26 @@
+"""add outgoing messages parts_sent
+
+Revision ID: d4f7b1c9e520
+Revises: c9e4a2b6d318
+Create Date: 2026-10-18 14:00:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f7b1c9e520'
+down_revision: Union[str, None] = 'c9e4a2b6d318'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('outgoing_messages', sa.Column('parts_sent', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('outgoing_messages', 'parts_sent')
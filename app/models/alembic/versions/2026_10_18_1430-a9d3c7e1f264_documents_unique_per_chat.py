@@ -0,0 +1,40 @@
+"""documents unique per chat
+
+Revision ID: a9d3c7e1f264
+Revises: d4f7b1c9e520
+Create Date: 2026-10-18 14:30:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9d3c7e1f264'
+down_revision: Union[str, None] = 'd4f7b1c9e520'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A file forwarded into another chat keeps its file_id, but belongs to that chat's digest too;
+    # its summary is shared through document_summary_cache instead
+    op.drop_constraint('documents_telegram_file_id_key', 'documents', type_='unique')
+    op.create_unique_constraint(
+        'uq_documents_chat_id_telegram_file_id', 'documents', ['chat_id', 'telegram_file_id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_documents_chat_id_telegram_file_id', 'documents', type_='unique')
+    # Keep the first copy of every file
+    op.execute(
+        sa.text(
+            "DELETE FROM documents USING documents AS first "
+            "WHERE documents.telegram_file_id = first.telegram_file_id "
+            "AND (documents.created_at, documents.id) > (first.created_at, first.id)"
+        )
+    )
+    op.create_unique_constraint('documents_telegram_file_id_key', 'documents', ['telegram_file_id'])
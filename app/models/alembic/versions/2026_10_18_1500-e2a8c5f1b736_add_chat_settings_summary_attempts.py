@@ -0,0 +1,26 @@
+"""add chat_settings summary_attempts
+
+Revision ID: e2a8c5f1b736
+Revises: a9d3c7e1f264
+Create Date: 2026-10-18 15:00:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a8c5f1b736'
+down_revision: Union[str, None] = 'a9d3c7e1f264'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('chat_settings', sa.Column('summary_attempts', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('chat_settings', 'summary_attempts')
@@ -0,0 +1,44 @@
+"""convert messages sent_at to utc
+
+Revision ID: f5b1d8e3a947
+Revises: e2a8c5f1b736
+Create Date: 2026-10-18 15:30:00.000000+00:00
+
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5b1d8e3a947'
+down_revision: Union[str, None] = 'e2a8c5f1b736'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _local_timezone() -> str | None:
+    """Zone the bot stamped sent_at in before it switched to UTC, taken from TZ like datetime.now() did."""
+    tz = os.environ.get("TZ", "").lstrip(":")
+    return None if tz in ("", "UTC", "Etc/UTC") else tz
+
+
+def upgrade() -> None:
+    tz = _local_timezone()
+    if tz is None:
+        return
+    # Rows move between monthly partitions when the shift crosses a month boundary
+    op.execute(
+        sa.text("UPDATE messages SET sent_at = (sent_at AT TIME ZONE :tz) AT TIME ZONE 'UTC'").bindparams(tz=tz)
+    )
+
+
+def downgrade() -> None:
+    tz = _local_timezone()
+    if tz is None:
+        return
+    op.execute(
+        sa.text("UPDATE messages SET sent_at = (sent_at AT TIME ZONE 'UTC') AT TIME ZONE :tz").bindparams(tz=tz)
+    )
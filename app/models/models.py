@@ -4,6 +4,7 @@ from uuid import UUID
 
 from aiogram.enums import ContentType
 from sqlalchemy import BigInteger, String, Text, ForeignKey, Index, Time
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime, time
 from app.models.base import ModelsBase
@@ -16,6 +17,19 @@ class AnalysisProcessingStatusEnum(Enum):
     PENDING = "pending"
     ANALYZED = "analyzed"
     ERROR = "error"
+    UNSUPPORTED = "unsupported"  # no extractor for the file type, never downloaded
+    REJECTED = "rejected"  # refused by admission control (size, type or chat quota), never downloaded
+
+
+class DeliveryStatusEnum(Enum):
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"  # rejected by Telegram (e.g. bot removed from the chat) or out of attempts
+
+
+class SummaryKindEnum(Enum):
+    DAILY = "daily"
+    PARTIAL = "partial"  # condensed part of a day, merged into the daily digest
 
 
 # Models
@@ -58,10 +72,21 @@ class ChatSettings(ModelsBase):
 
     chat_id: Mapped[int] = mapped_column(ForeignKey("chats.id"), primary_key=True)
     summary_time: Mapped[time] = mapped_column(Time, nullable=False)
+    timezone: Mapped[str] = mapped_column(String(64), nullable=False, default="UTC", server_default="UTC")
+    # Naive UTC moment of the next digest, see ChatsRepository.claim_due_chats
+    next_summary_at: Mapped[datetime] = mapped_column(sa.DateTime, nullable=False, index=True)
+    summary_lease_expires_at: Mapped[Optional[datetime]] = mapped_column(sa.DateTime, nullable=True)
+    # Claims of the digest due at next_summary_at, see ChatsRepository.claim_due_chats
+    summary_attempts: Mapped[int] = mapped_column(sa.Integer, nullable=False, default=0, server_default="0")
 
 
 class Message(ModelsBase):
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_chat_id_sent_at", "chat_id", "sent_at", postgresql_include=["id"]),
+        # Range-partitioned by month, see app/ai_analysis/partition_maintenance.py
+        {"postgresql_partition_by": "RANGE (sent_at)"},
+    )
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
     chat_id: Mapped[int] = mapped_column(ForeignKey("chats.id"), nullable=False)
@@ -69,35 +94,117 @@ class Message(ModelsBase):
     message_text: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     message_type: Mapped[ContentType] = mapped_column(sa.String(50), nullable=False,
                                                           default=ContentType.TEXT)
-    sent_at: Mapped[datetime] = mapped_column(sa.DateTime, nullable=False)
+    sent_at: Mapped[datetime] = mapped_column(sa.DateTime, primary_key=True)
 
     chat = relationship("Chat", back_populates="messages")
     sender_user = relationship("User", back_populates="messages")
-    documents = relationship("Document", uselist=False, back_populates="message")
+    documents = relationship(
+        "Document",
+        uselist=False,
+        back_populates="message",
+        primaryjoin="Message.id == foreign(Document.message_fk)",
+    )
 
 
 class Document(ModelsBase):
     __tablename__ = "documents"
-
-    message_fk: Mapped[int] = mapped_column(ForeignKey("messages.id"), nullable=False)
-    telegram_file_id: Mapped[str] = mapped_column(String(255), nullable=False, unique=True)
+    __table_args__ = (
+        Index("ix_documents_processing_status_lease_expires_at", "processing_status", "lease_expires_at"),
+        Index("ix_documents_chat_id_analysis_started_at", "chat_id", "analysis_started_at"),
+        # A file forwarded into several chats is stored once per chat; summaries are shared via the cache
+        sa.UniqueConstraint("chat_id", "telegram_file_id", name="uq_documents_chat_id_telegram_file_id"),
+    )
+
+    # No FK: the partitioned messages table is only unique on (id, sent_at)
+    message_fk: Mapped[int] = mapped_column(BigInteger, nullable=False, index=True)
+    # Denormalized from the message for the per-chat quota, see app/ai_analysis/admission.py
+    chat_id: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    telegram_file_id: Mapped[str] = mapped_column(String(255), nullable=False)
+    # Same for a file in every chat, unlike telegram_file_id
+    telegram_file_unique_id: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     file_name: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
-    file_type: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
+    file_type: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)  # mime type
     file_size_bytes: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
     analysis_content: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     processing_status: Mapped[AnalysisProcessingStatusEnum] = mapped_column(String(50), nullable=False,
                                                                             default=AnalysisProcessingStatusEnum.NOT_STARTED.value)
     analysis_started_at: Mapped[Optional[datetime]] = mapped_column(sa.DateTime, nullable=True)
     analysis_completed_at: Mapped[Optional[datetime]] = mapped_column(sa.DateTime, nullable=True)
+    # Lease of the worker currently processing the document, see DocumentsRepository.claim_documents
+    claimed_by: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(sa.DateTime, nullable=True)
+    processing_attempts: Mapped[int] = mapped_column(sa.Integer, nullable=False, default=0, server_default="0")
+
+    message = relationship(
+        "Message",
+        back_populates="documents",
+        primaryjoin="foreign(Document.message_fk) == Message.id",
+    )
+
+
+class DocumentSummaryCache(ModelsBase):
+    """Summaries of already analyzed files, keyed by ``file:<telegram file_unique_id>`` or ``sha256:<content hash>``."""
+    __tablename__ = "document_summary_cache"
+
+    id: None = None
+
+    cache_key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    summary: Mapped[str] = mapped_column(Text, nullable=False)
+
+
+class FSMState(ModelsBase):
+    """Conversation state of the bot, shared by all replicas. See app/bot/fsm_storage.py"""
+    __tablename__ = "fsm_states"
+
+    id: None = None
 
-    message = relationship("Message", back_populates="documents")
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    state: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    data: Mapped[dict] = mapped_column(JSONB, nullable=False, default=dict, server_default=sa.text("'{}'::jsonb"))
+    # Abandoned conversations are ignored after this moment and deleted in batches later
+    expires_at: Mapped[datetime] = mapped_column(sa.DateTime, nullable=False, index=True)
+
+
+class OutgoingMessage(ModelsBase):
+    """Outbox of bot messages, drained by app/ai_analysis/delivery.py"""
+    __tablename__ = "outgoing_messages"
+    __table_args__ = (
+        Index("ix_outgoing_messages_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    chat_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+    status: Mapped[DeliveryStatusEnum] = mapped_column(String(20), nullable=False,
+                                                       default=DeliveryStatusEnum.PENDING.value)
+    # Claiming a message moves this forward by the lease, so other workers skip it meanwhile
+    next_attempt_at: Mapped[datetime] = mapped_column(sa.DateTime, nullable=False)
+    attempts: Mapped[int] = mapped_column(sa.Integer, nullable=False, default=0, server_default="0")
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    sent_at: Mapped[Optional[datetime]] = mapped_column(sa.DateTime, nullable=True)
+    # Parts of a text longer than one Telegram message already sent, so a retry doesn't repeat them
+    parts_sent: Mapped[int] = mapped_column(sa.Integer, nullable=False, default=0, server_default="0")
+    # Digest this message delivers; unique, so a digest is never queued twice
+    summary_id: Mapped[Optional[UUID]] = mapped_column(ForeignKey("summaries.id"), nullable=True, unique=True)
+    # When the message was meant to arrive (the digest's due time), for the delivery lag metric
+    scheduled_at: Mapped[Optional[datetime]] = mapped_column(sa.DateTime, nullable=True)
 
 
 class Summary(ModelsBase):
     __tablename__ = "summaries"
+    __table_args__ = (
+        Index(
+            "uq_summaries_partial_chat_id_until",
+            "chat_id",
+            "messages_until_time",
+            unique=True,
+            postgresql_where=sa.text("kind = 'partial'"),
+        ),
+    )
 
     chat_id: Mapped[int] = mapped_column(ForeignKey("chats.id"), nullable=False)
     generated_at: Mapped[datetime] = mapped_column(sa.DateTime, nullable=False, default=sa.func.now())
     summary_content: Mapped[str] = mapped_column(Text, nullable=False)
     messages_since_time: Mapped[datetime] = mapped_column(sa.DateTime, nullable=False)
     messages_until_time: Mapped[datetime] = mapped_column(sa.DateTime, nullable=False)
+    kind: Mapped[SummaryKindEnum] = mapped_column(String(20), nullable=False,
+                                                  default=SummaryKindEnum.DAILY.value, server_default="daily")
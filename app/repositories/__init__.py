@@ -1,5 +1,8 @@
 from .chats import ChatsRepository
 from .documents import DocumentsRepository
+from .fsm import FSMRepository
+from .outgoing_messages import OutgoingMessagesRepository
+from .partitions import PartitionsRepository
 from .summaries import SummariesRepository
 from .user import UserRepository
 
@@ -10,3 +13,6 @@ class Repositories:
     chats = ChatsRepository()
     documents = DocumentsRepository()
     summaries = SummariesRepository()
+    partitions = PartitionsRepository()
+    fsm = FSMRepository()
+    outgoing_messages = OutgoingMessagesRepository()
@@ -1,16 +1,34 @@
 from datetime import time
-from datetime import datetime
-from typing import Sequence
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Any, Sequence
+from zoneinfo import ZoneInfo
 
 from aiogram.enums import ContentType
+from sqlalchemy import delete, func, literal, or_, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.exc import IntegrityError
-from app.models.models import Chat, ChatAdmin, ChatSettings, Message, Document
+from app.models.models import AnalysisProcessingStatusEnum, Chat, ChatAdmin, ChatSettings, Message, Document
+from app.repositories.documents import DOCUMENTS_QUEUED_CHANNEL
+
+
+def next_summary_occurrence(summary_time: time, timezone: str, after: datetime) -> datetime:
+    """
+    Return the first moment strictly after *after* when the clock in *timezone* shows *summary_time*.
+    Both *after* and the result are naive UTC datetimes.
+    """
+    tz = ZoneInfo(timezone)
+    day = after.replace(tzinfo=dt_timezone.utc).astimezone(tz).date()
+    while True:
+        candidate = datetime.combine(day, summary_time, tzinfo=tz).astimezone(dt_timezone.utc).replace(tzinfo=None)
+        if candidate > after:
+            return candidate
+        day += timedelta(days=1)
 
 
 class ChatsRepository:
-    async def create_chat(self, chat_id: int, title: str, session: AsyncSession) -> Chat:
+    async def create_chat(self, chat_id: int, title: str, session: AsyncSession, timezone: str = "UTC") -> Chat:
         # Create the chat
         new_chat = Chat(
             id=chat_id,
@@ -19,13 +37,16 @@ class ChatsRepository:
         )
         session.add(new_chat)
 
+        summary_time = time(hour=19)
         new_chat_settings = ChatSettings(
             chat_id=chat_id,
-            summary_time=time(hour=19),
+            summary_time=summary_time,
+            timezone=timezone,
+            next_summary_at=next_summary_occurrence(summary_time, timezone, datetime.utcnow()),
         )
         session.add(new_chat_settings)
         try:
-            await session.commit()
+            await session.flush()
             return new_chat
         except IntegrityError:
             await session.rollback()
@@ -55,7 +76,7 @@ class ChatsRepository:
         session.add(chat_admin)
 
         try:
-            await session.commit()
+            await session.flush()
             return chat_admin
         except IntegrityError:
             await session.rollback()
@@ -73,7 +94,7 @@ class ChatsRepository:
             return False
 
         await session.delete(chat_admin)
-        await session.commit()
+        await session.flush()
         return True
 
     async def is_chat_admin(self, chat_id: int, user_id: int, session: AsyncSession) -> bool:
@@ -90,9 +111,49 @@ class ChatsRepository:
             return False
 
         chat.chat_title = title
-        await session.commit()
+        await session.flush()
         return True
 
+    async def migrate_chat(self, chat_id: int, new_chat_id: int, session: AsyncSession) -> None:
+        """
+        Carry a group that became a supergroup over to *new_chat_id*: the chat, its admins and
+        its digest schedule move there, while messages and summaries stay under the old id.
+        """
+        now = datetime.utcnow()
+        await session.execute(
+            insert(Chat)
+            .from_select(
+                ["id", "chat_title", "bot_added_at", "created_at"],
+                select(literal(new_chat_id), Chat.chat_title, Chat.bot_added_at, literal(now)).where(
+                    Chat.id == chat_id
+                ),
+            )
+            .on_conflict_do_nothing(index_elements=[Chat.id])
+        )
+        await session.execute(
+            insert(ChatAdmin)
+            .from_select(
+                ["user_id", "chat_id", "first_acknowledged_admin_at", "created_at"],
+                select(
+                    ChatAdmin.user_id, literal(new_chat_id), ChatAdmin.first_acknowledged_admin_at, literal(now)
+                ).where(ChatAdmin.chat_id == chat_id),
+            )
+            .on_conflict_do_nothing(index_elements=[ChatAdmin.user_id, ChatAdmin.chat_id])
+        )
+        # The old chat's settings win over defaults the new id may have got meanwhile
+        old_settings = await session.execute(
+            select(ChatSettings.chat_id).where(ChatSettings.chat_id == chat_id).with_for_update()
+        )
+        if old_settings.scalar_one_or_none() is None:
+            return
+        await session.execute(delete(ChatSettings).where(ChatSettings.chat_id == new_chat_id))
+        await session.execute(
+            update(ChatSettings)
+            .where(ChatSettings.chat_id == chat_id)
+            .values(chat_id=new_chat_id)
+            .execution_options(synchronize_session=False)
+        )
+
     async def add_message(
         self,
         chat_id: int,
@@ -117,37 +178,133 @@ class ChatsRepository:
         await session.flush()
         return message
 
-    async def set_summary_time(self, chat_id: int, time: time, session: AsyncSession) -> None:
+    async def set_summary_time(self, chat_id: int, time: time, session: AsyncSession, timezone: str = "UTC") -> None:
         query = select(ChatSettings).where(ChatSettings.chat_id == chat_id)
         result = await session.execute(query)
         settings = result.scalars().first()
         if not settings:
-            settings = ChatSettings(chat_id=chat_id, summary_time=time)
+            settings = ChatSettings(chat_id=chat_id, summary_time=time, timezone=timezone)
             session.add(settings)
         else:
             settings.summary_time = time
-        await session.commit()
+        settings.next_summary_at = next_summary_occurrence(time, settings.timezone, datetime.utcnow())
+        settings.summary_attempts = 0
+        settings.summary_lease_expires_at = None
+        await session.flush()
 
     async def add_document(self, message_id: int, telegram_file_id: str,
-                           file_name: str, file_type: str, file_size: int, session: AsyncSession) -> Document:
+                           file_name: str, file_type: str, file_size: int, session: AsyncSession,
+                           telegram_file_unique_id: str | None = None,
+                           processing_status: str = AnalysisProcessingStatusEnum.NOT_STARTED.value,
+                           chat_id: int | None = None) -> Document:
         document = Document(
             message_fk=message_id,
+            chat_id=chat_id,
             telegram_file_id=telegram_file_id,
+            telegram_file_unique_id=telegram_file_unique_id,
             file_name=file_name,
             file_type=file_type,
-            file_size_bytes=file_size
+            file_size_bytes=file_size,
+            processing_status=processing_status,
         )
         session.add(document)
         await session.flush()
+        await self._notify_documents_queued(session)
         return document
 
-    async def get_chats_due_for_summary(self, now: datetime, session: AsyncSession) -> Sequence[int]:
-        """Return chat IDs whose :class:`ChatSettings.summary_time` matches *now* (hour & minute)."""
-        summary_time = time(hour=now.hour, minute=now.minute)
-        stmt = select(ChatSettings.chat_id).where(ChatSettings.summary_time == summary_time)
-        result = await session.execute(stmt)
+    async def add_messages(self, rows: Sequence[dict[str, Any]], session: AsyncSession) -> list[int]:
+        """Insert many messages with one multi-row INSERT, returning their IDs in *rows* order."""
+        if not rows:
+            return []
+        stmt = insert(Message).returning(Message.id, sort_by_parameter_order=True)
+        result = await session.execute(stmt, list(rows))
         return [row[0] for row in result.all()]
 
+    async def add_documents(self, rows: Sequence[dict[str, Any]], session: AsyncSession) -> None:
+        """Insert many documents at once, skipping files that are already stored for their chat."""
+        if not rows:
+            return
+        stmt = insert(Document).on_conflict_do_nothing(index_elements=[Document.chat_id, Document.telegram_file_id])
+        await session.execute(stmt, list(rows))
+        await self._notify_documents_queued(session)
+
+    @staticmethod
+    async def _notify_documents_queued(session: AsyncSession) -> None:
+        # Postgres delivers the notification only when the transaction commits
+        await session.execute(select(func.pg_notify(DOCUMENTS_QUEUED_CHANNEL, "")))
+
+    async def claim_due_chats(
+        self, now: datetime, lease: timedelta, limit: int, max_attempts: int, session: AsyncSession
+    ) -> Sequence[tuple[int, datetime]]:
+        """
+        Lease up to *limit* chats whose ``next_summary_at`` is due at *now* (naive UTC).
+
+        Returns ``(chat_id, due_at)`` pairs. Rows locked by another scheduler are skipped and
+        leased chats are not returned again until the lease expires, so a digest is neither
+        sent twice nor lost if the process dies before :meth:`advance_summary_schedule`.
+        After downtime only the most recent missed occurrence is kept.
+        Each retry of the same digest is leased twice as long as the one before, and after
+        *max_attempts* claims the digest is given up and the chat waits for its next one.
+        """
+        stmt = (
+            select(ChatSettings)
+            .where(
+                ChatSettings.next_summary_at <= now,
+                or_(
+                    ChatSettings.summary_lease_expires_at.is_(None),
+                    ChatSettings.summary_lease_expires_at < now,
+                ),
+            )
+            .order_by(ChatSettings.next_summary_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await session.execute(stmt)
+        claimed = []
+        for settings in result.scalars().all():
+            due_at = settings.next_summary_at
+            following = next_summary_occurrence(settings.summary_time, settings.timezone, due_at)
+            while following <= now:
+                due_at, following = following, next_summary_occurrence(settings.summary_time, settings.timezone, following)
+            if due_at != settings.next_summary_at:
+                settings.summary_attempts = 0
+            if settings.summary_attempts >= max_attempts:
+                settings.next_summary_at = following
+                settings.summary_attempts = 0
+                settings.summary_lease_expires_at = None
+                continue
+            settings.next_summary_at = due_at
+            # The lease of a retry doubles as its backoff
+            settings.summary_lease_expires_at = now + lease * 2 ** settings.summary_attempts
+            settings.summary_attempts += 1
+            claimed.append((settings.chat_id, due_at))
+        await session.flush()
+        return claimed
+
+    async def advance_summary_schedule(self, chat_id: int, due_at: datetime, session: AsyncSession) -> None:
+        """Move the chat past the *due_at* digest and release its lease."""
+        query = select(ChatSettings).where(ChatSettings.chat_id == chat_id)
+        result = await session.execute(query)
+        settings = result.scalars().first()
+        # The schedule may have been changed with /set_time in the meantime
+        if not settings or settings.next_summary_at != due_at:
+            return
+        settings.next_summary_at = next_summary_occurrence(settings.summary_time, settings.timezone, due_at)
+        settings.summary_attempts = 0
+        settings.summary_lease_expires_at = None
+        await session.flush()
+
+    async def get_next_summary_at(self, now: datetime, session: AsyncSession) -> datetime | None:
+        """Earliest scheduled digest among chats that are not leased at *now*."""
+        stmt = select(func.min(ChatSettings.next_summary_at)).where(
+            or_(
+                ChatSettings.summary_lease_expires_at.is_(None),
+                ChatSettings.summary_lease_expires_at < now,
+            )
+        )
+        result = await session.execute(stmt)
+        return result.scalar_one_or_none()
+
     async def get_messages_between(
         self,
         chat_id: int,
@@ -155,6 +312,7 @@ class ChatsRepository:
         until: datetime,
         session: AsyncSession,
     ) -> Sequence[Message]:
+        """Messages sent in [*since*, *until*), so adjacent windows neither overlap nor leave a gap."""
         # normalize datetimes to naive for TIMESTAMP WITHOUT TIME ZONE columns
         if since.tzinfo is not None:
             since = since.replace(tzinfo=None)
@@ -164,14 +322,25 @@ class ChatsRepository:
             select(Message)
             .where(
                 Message.chat_id == chat_id,
+                Message.sent_at >= since,
                 Message.sent_at < until,
-                Message.sent_at > since,
             )
             .order_by(Message.sent_at)
         )
         result = await session.execute(stmt)
         return result.scalars().all()
 
+    async def get_chats_with_messages_between(
+        self, since: datetime, until: datetime, session: AsyncSession
+    ) -> Sequence[int]:
+        stmt = (
+            select(Message.chat_id)
+            .where(Message.sent_at >= since, Message.sent_at < until)
+            .distinct()
+        )
+        result = await session.execute(stmt)
+        return [row[0] for row in result.all()]
+
     async def get_documents_summaries_between(
         self,
         chat_id: int,
@@ -179,6 +348,7 @@ class ChatsRepository:
         until: datetime,
         session: AsyncSession,
     ) -> Sequence[str]:
+        """Summaries of documents attached to messages sent in [*since*, *until*)."""
         # normalize datetimes to naive for TIMESTAMP WITHOUT TIME ZONE columns
         if since.tzinfo is not None:
             since = since.replace(tzinfo=None)
@@ -190,8 +360,8 @@ class ChatsRepository:
             .where(
                 Message.chat_id == chat_id,
                 Document.analysis_content.is_not(None),  # type: ignore
+                Message.sent_at >= since,
                 Message.sent_at < until,
-                Message.sent_at > since,
             )
         )
         result = await session.execute(stmt)
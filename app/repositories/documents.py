@@ -1,54 +1,202 @@
 from __future__ import annotations
 
-from datetime import datetime
-from typing import Sequence
+from datetime import datetime, timedelta
+from typing import Collection, Sequence, cast
+from uuid import UUID
 
+from sqlalchemy import ColumnElement, CursorResult, and_, func, or_, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
-from app.models.models import Document, AnalysisProcessingStatusEnum
+from app.models.models import Document, DocumentSummaryCache, AnalysisProcessingStatusEnum
+
+# NOTIFY channel signalled whenever new documents are stored
+DOCUMENTS_QUEUED_CHANNEL = "documents_queued"
+
+
+def _leased_to(worker_id: str, documents: Sequence[Document], now: datetime) -> ColumnElement[bool]:
+    """
+    Rows of *documents* still leased to *worker_id* by the claims that returned them.
+    A claim sets ``analysis_started_at``, so a document re-claimed meanwhile no longer matches,
+    even by the same worker.
+    """
+    return and_(
+        tuple_(Document.id, Document.analysis_started_at).in_(
+            [(document.id, document.analysis_started_at) for document in documents]
+        ),
+        Document.claimed_by == worker_id,
+        Document.processing_status == AnalysisProcessingStatusEnum.PENDING.value,  # type: ignore[arg-type]
+        Document.lease_expires_at > now,
+    )
 
 
 class DocumentsRepository:
-    async def get_unprocessed_documents(
-        self, batch_size: int, session: AsyncSession
+    async def claim_documents(
+        self,
+        worker_id: str,
+        batch_size: int,
+        lease: timedelta,
+        max_attempts: int,
+        session: AsyncSession,
     ) -> Sequence[Document]:
-        stmt = (
-            select(Document)
-            .where(Document.processing_status == AnalysisProcessingStatusEnum.NOT_STARTED.value)  # type: ignore[arg-type]
+        """
+        Atomically hand up to *batch_size* documents over to *worker_id*.
+
+        Picks NOT_STARTED documents and PENDING ones whose lease has expired (their worker
+        crashed). Rows locked by other workers are skipped, so concurrent workers never get
+        the same document. Expired documents that already used *max_attempts* are marked ERROR.
+        """
+        now = datetime.utcnow()
+        lease_expired = and_(
+            Document.processing_status == AnalysisProcessingStatusEnum.PENDING.value,  # type: ignore[arg-type]
+            or_(Document.lease_expires_at.is_(None), Document.lease_expires_at < now),
+        )
+
+        await session.execute(
+            update(Document)
+            .where(lease_expired, Document.processing_attempts >= max_attempts)
+            .values(
+                processing_status=AnalysisProcessingStatusEnum.ERROR.value,
+                claimed_by=None,
+                lease_expires_at=None,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+        claimable = (
+            select(Document.id)
+            .where(
+                or_(
+                    Document.processing_status == AnalysisProcessingStatusEnum.NOT_STARTED.value,  # type: ignore[arg-type]
+                    lease_expired,
+                )
+            )
+            .order_by(Document.created_at)
             .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(Document)
+            .where(Document.id.in_(claimable.scalar_subquery()))
+            .values(
+                processing_status=AnalysisProcessingStatusEnum.PENDING.value,
+                claimed_by=worker_id,
+                lease_expires_at=now + lease,
+                analysis_started_at=now,
+                processing_attempts=Document.processing_attempts + 1,
+            )
+            .returning(Document)
+            .execution_options(synchronize_session=False)
         )
         result = await session.execute(stmt)
         return result.scalars().all()
 
-    async def mark_pending(self, documents: Sequence[Document], session: AsyncSession) -> None:
+    async def renew_leases(
+        self, documents: Sequence[Document], worker_id: str, lease: timedelta, session: AsyncSession
+    ) -> set[UUID]:
+        """Extend the leases *worker_id* still holds on *documents*; returns the ids of those documents."""
+        if not documents:
+            return set()
         now = datetime.utcnow()
-        stmt = select(Document).where(Document.id.in_([doc.id for doc in documents]))
+        stmt = (
+            update(Document)
+            .where(_leased_to(worker_id, documents, now))
+            .values(lease_expires_at=now + lease)
+            .returning(Document.id)
+            .execution_options(synchronize_session=False)
+        )
         result = await session.execute(stmt)
+        return set(result.scalars().all())
 
-        documents = result.scalars().all()
+    async def save_summary(self, document: Document, summary: str, worker_id: str, session: AsyncSession) -> bool:
+        """Store the summary of *document* unless *worker_id* lost its lease; returns whether it was stored."""
+        now = datetime.utcnow()
+        stmt = (
+            update(Document)
+            .where(_leased_to(worker_id, [document], now))
+            .values(
+                analysis_content=summary,
+                processing_status=AnalysisProcessingStatusEnum.ANALYZED.value,
+                analysis_completed_at=now,
+                claimed_by=None,
+                lease_expires_at=None,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        result = cast(CursorResult, await session.execute(stmt))
+        return result.rowcount > 0
 
-        for document in documents:
-            document.processing_status = AnalysisProcessingStatusEnum.PENDING.value  # type: ignore[assignment]
-            document.analysis_started_at = now
-        await session.flush()
+    async def mark_error(self, document: Document, worker_id: str, session: AsyncSession) -> None:
+        await self.release_documents([document], AnalysisProcessingStatusEnum.ERROR, worker_id, session)
 
-    async def save_summary(
-        self, document: Document, summary: str, session: AsyncSession
+    async def release_documents(
+        self,
+        documents: Sequence[Document],
+        status: AnalysisProcessingStatusEnum,
+        worker_id: str,
+        session: AsyncSession,
     ) -> None:
-        stmt = select(Document).where(Document.id == document.id)
+        """
+        Give up the lease *worker_id* holds on *documents*, leaving them with the final *status*.
+        Documents another worker has re-claimed meanwhile are left alone.
+        """
+        if not documents:
+            return
+        stmt = (
+            update(Document)
+            .where(_leased_to(worker_id, documents, datetime.utcnow()))
+            .values(
+                processing_status=status.value,
+                claimed_by=None,
+                lease_expires_at=None,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await session.execute(stmt)
 
+    async def count_claimed_by_chat(
+        self,
+        chat_ids: Collection[int],
+        since: datetime,
+        exclude_ids: Sequence[UUID],
+        session: AsyncSession,
+    ) -> dict[int, int]:
+        """Number of documents per chat claimed for processing since *since*, except *exclude_ids*."""
+        if not chat_ids:
+            return {}
+        stmt = (
+            select(Document.chat_id, func.count())
+            .where(
+                Document.chat_id.in_(chat_ids),
+                Document.analysis_started_at >= since,
+                Document.processing_status.in_(
+                    [AnalysisProcessingStatusEnum.PENDING.value, AnalysisProcessingStatusEnum.ANALYZED.value]
+                ),
+                Document.id.not_in(exclude_ids),
+            )
+            .group_by(Document.chat_id)
+        )
         result = await session.execute(stmt)
+        return {chat_id: count for chat_id, count in result.all()}
 
-        document = result.scalars().one_or_none()
-        if not document:
-            return
+    async def count_by_status(self, session: AsyncSession) -> dict[str, int]:
+        stmt = select(Document.processing_status, func.count()).group_by(Document.processing_status)
+        result = await session.execute(stmt)
+        return {status: count for status, count in result.all()}
 
-        document.analysis_content = summary
-        document.processing_status = AnalysisProcessingStatusEnum.ANALYZED.value  # type: ignore[assignment]
-        document.analysis_completed_at = datetime.utcnow()
-        await session.flush()
+    async def get_cached_summary(self, cache_keys: Sequence[str], session: AsyncSession) -> str | None:
+        if not cache_keys:
+            return None
+        stmt = select(DocumentSummaryCache.summary).where(DocumentSummaryCache.cache_key.in_(cache_keys)).limit(1)
+        result = await session.execute(stmt)
+        return result.scalar_one_or_none()
 
-    async def mark_error(self, document: Document, session: AsyncSession) -> None:
-        document.processing_status = AnalysisProcessingStatusEnum.ERROR.value  # type: ignore[assignment]
-        await session.flush()
+    async def save_cached_summary(self, cache_keys: Sequence[str], summary: str, session: AsyncSession) -> None:
+        if not cache_keys:
+            return
+        now = datetime.utcnow()
+        stmt = insert(DocumentSummaryCache).on_conflict_do_nothing(index_elements=[DocumentSummaryCache.cache_key])
+        await session.execute(
+            stmt, [{"cache_key": key, "summary": summary, "created_at": now} for key in cache_keys]
+        )
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import case, delete, literal, null, select
+from sqlalchemy.dialects.postgresql import JSONB, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import FSMState
+
+
+class FSMRepository:
+    """
+    Rows of ``fsm_states``. A row past ``expires_at`` is treated as absent until it's deleted,
+    so writes to it start a fresh conversation instead of reviving the abandoned one.
+    """
+
+    @staticmethod
+    def _upsert(key: str, now: datetime, expires_at: datetime, **values: Any):
+        stmt = insert(FSMState).values(key=key, expires_at=expires_at, created_at=now, **values)
+        # Inside ON CONFLICT DO UPDATE the table columns refer to the existing row
+        alive = FSMState.expires_at > now
+        return stmt, alive
+
+    async def get(self, key: str, now: datetime, session: AsyncSession) -> FSMState | None:
+        stmt = select(FSMState).where(FSMState.key == key, FSMState.expires_at > now)
+        result = await session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def set_state(
+        self, key: str, state: str | None, now: datetime, expires_at: datetime, session: AsyncSession
+    ) -> None:
+        stmt, alive = self._upsert(key, now, expires_at, state=state, data={})
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[FSMState.key],
+            set_={
+                "state": stmt.excluded.state,
+                "data": case((alive, FSMState.data), else_=literal({}, JSONB)),
+                "expires_at": stmt.excluded.expires_at,
+                "updated_at": now,
+            },
+        )
+        await session.execute(stmt)
+
+    async def set_data(
+        self, key: str, data: dict[str, Any], now: datetime, expires_at: datetime, session: AsyncSession
+    ) -> None:
+        stmt, alive = self._upsert(key, now, expires_at, data=data)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[FSMState.key],
+            set_={
+                "state": case((alive, FSMState.state), else_=null()),
+                "data": stmt.excluded.data,
+                "expires_at": stmt.excluded.expires_at,
+                "updated_at": now,
+            },
+        )
+        await session.execute(stmt)
+
+    async def update_data(
+        self, key: str, data: dict[str, Any], now: datetime, expires_at: datetime, session: AsyncSession
+    ) -> dict[str, Any]:
+        """Merge *data* into the stored dict in one statement and return the result."""
+        stmt, alive = self._upsert(key, now, expires_at, data=data)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[FSMState.key],
+            set_={
+                "state": case((alive, FSMState.state), else_=null()),
+                "data": case((alive, FSMState.data), else_=literal({}, JSONB)).op("||")(stmt.excluded.data),
+                "expires_at": stmt.excluded.expires_at,
+                "updated_at": now,
+            },
+        ).returning(FSMState.data)
+        result = await session.execute(stmt)
+        return result.scalar_one()
+
+    async def delete_if_empty(self, key: str, session: AsyncSession) -> None:
+        """Drop the row once a conversation is cleared (no state and no data)."""
+        stmt = delete(FSMState).where(
+            FSMState.key == key, FSMState.state.is_(None), FSMState.data == literal({}, JSONB)
+        )
+        await session.execute(stmt)
+
+    async def delete_expired(self, now: datetime, batch_size: int, session: AsyncSession) -> int:
+        """Delete up to *batch_size* expired rows, skipping rows other replicas are writing."""
+        expired = (
+            select(FSMState.key)
+            .where(FSMState.expires_at <= now)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        result = await session.execute(
+            delete(FSMState).where(FSMState.key.in_(expired.scalar_subquery())).execution_options(
+                synchronize_session=False
+            )
+        )
+        return result.rowcount
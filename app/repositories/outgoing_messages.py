@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Sequence
+from uuid import UUID
+
+from sqlalchemy import func, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models.models import DeliveryStatusEnum, OutgoingMessage
+
+# NOTIFY channel signalled whenever messages are put into the outbox
+OUTGOING_MESSAGES_QUEUED_CHANNEL = "outgoing_messages_queued"
+
+
+class OutgoingMessagesRepository:
+    async def enqueue(
+        self,
+        chat_id: int,
+        text: str,
+        session: AsyncSession,
+        summary_id: UUID | None = None,
+        scheduled_at: datetime | None = None,
+    ) -> None:
+        """
+        Put a message into the outbox, due right away. A digest is queued at most once,
+        whatever the number of calls with its *summary_id*.
+        """
+        now = datetime.utcnow()
+        stmt = (
+            insert(OutgoingMessage)
+            .values(
+                chat_id=chat_id,
+                text=text,
+                status=DeliveryStatusEnum.PENDING.value,
+                next_attempt_at=now,
+                summary_id=summary_id,
+                scheduled_at=scheduled_at,
+                created_at=now,
+            )
+            .on_conflict_do_nothing(index_elements=[OutgoingMessage.summary_id])
+        )
+        await session.execute(stmt)
+        # Postgres delivers the notification only when the transaction commits
+        await session.execute(select(func.pg_notify(OUTGOING_MESSAGES_QUEUED_CHANNEL, "")))
+
+    async def claim_due(
+        self, now: datetime, lease: timedelta, limit: int, max_attempts: int, session: AsyncSession
+    ) -> Sequence[OutgoingMessage]:
+        """
+        Lease up to *limit* pending messages due at *now*, oldest first.
+
+        The lease pushes ``next_attempt_at`` forward, so a message whose worker died is picked
+        up again once it runs out. Due messages that already used *max_attempts* are marked FAILED.
+        """
+        await session.execute(
+            update(OutgoingMessage)
+            .where(
+                OutgoingMessage.status == DeliveryStatusEnum.PENDING.value,  # type: ignore[arg-type]
+                OutgoingMessage.next_attempt_at <= now,
+                OutgoingMessage.attempts >= max_attempts,
+            )
+            .values(status=DeliveryStatusEnum.FAILED.value)
+            .execution_options(synchronize_session=False)
+        )
+        claimable = (
+            select(OutgoingMessage.id)
+            .where(
+                OutgoingMessage.status == DeliveryStatusEnum.PENDING.value,  # type: ignore[arg-type]
+                OutgoingMessage.next_attempt_at <= now,
+            )
+            .order_by(OutgoingMessage.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(OutgoingMessage)
+            .where(OutgoingMessage.id.in_(claimable.scalar_subquery()))
+            .values(next_attempt_at=now + lease, attempts=OutgoingMessage.attempts + 1)
+            .returning(OutgoingMessage)
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.execute(stmt)
+        return sorted(result.scalars().all(), key=lambda message: message.created_at)
+
+    async def mark_sent(self, message: OutgoingMessage, session: AsyncSession) -> None:
+        await self._update(
+            message, session, status=DeliveryStatusEnum.SENT.value, sent_at=datetime.utcnow(), last_error=None
+        )
+
+    async def mark_failed(self, message: OutgoingMessage, error: str | None, session: AsyncSession) -> None:
+        await self._update(message, session, status=DeliveryStatusEnum.FAILED.value, last_error=error)
+
+    async def reschedule(
+        self,
+        message: OutgoingMessage,
+        next_attempt_at: datetime,
+        error: str | None,
+        parts_sent: int,
+        session: AsyncSession,
+    ) -> None:
+        await self._update(
+            message, session, next_attempt_at=next_attempt_at, last_error=error, parts_sent=parts_sent
+        )
+
+    async def move_to_chat(self, chat_id: int, new_chat_id: int, session: AsyncSession) -> None:
+        """Send pending messages of *chat_id* to *new_chat_id* instead, e.g. after a group migrated."""
+        stmt = (
+            update(OutgoingMessage)
+            .where(
+                OutgoingMessage.chat_id == chat_id,
+                OutgoingMessage.status == DeliveryStatusEnum.PENDING.value,  # type: ignore[arg-type]
+            )
+            .values(chat_id=new_chat_id)
+            .execution_options(synchronize_session=False)
+        )
+        await session.execute(stmt)
+
+    @staticmethod
+    async def _update(message: OutgoingMessage, session: AsyncSession, **values) -> None:
+        """
+        Update *message* as claimed by :meth:`claim_due`. Every claim increments ``attempts``,
+        so a worker that outlived its lease can't touch a message another worker claimed since.
+        """
+        stmt = (
+            update(OutgoingMessage)
+            .where(
+                OutgoingMessage.id == message.id,
+                OutgoingMessage.attempts == message.attempts,
+                OutgoingMessage.status == DeliveryStatusEnum.PENDING.value,  # type: ignore[arg-type]
+            )
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await session.execute(stmt)
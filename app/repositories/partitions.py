@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import re
+from datetime import date
+from typing import cast
+
+from sqlalchemy import CursorResult, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+_MESSAGES_PARTITION_RE = re.compile(r"^messages_y(\d{4})m(\d{2})$")
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _partition_name(month: date) -> str:
+    return f"messages_y{month.year:04d}m{month.month:02d}"
+
+
+class PartitionsRepository:
+    """Maintenance of the monthly range partitions of the ``messages`` table."""
+
+    async def get_messages_partitions(self, session: AsyncSession) -> dict[date, str]:
+        """Return monthly partitions of ``messages`` keyed by the first day of their month."""
+        stmt = text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = 'messages'"
+        )
+        result = await session.execute(stmt)
+        partitions = {}
+        for (name,) in result.all():
+            if match := _MESSAGES_PARTITION_RE.match(name):
+                partitions[date(int(match[1]), int(match[2]), 1)] = name
+        return partitions
+
+    async def create_messages_partitions(
+        self, since: date, months_ahead: int, session: AsyncSession
+    ) -> list[str]:
+        """Create missing partitions from the month of *since* up to *months_ahead* months later."""
+        existing = await self.get_messages_partitions(session)
+        created = []
+        month = _month_start(since)
+        for _ in range(months_ahead + 1):
+            if month not in existing:
+                name = _partition_name(month)
+                await session.execute(
+                    text(
+                        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF messages "
+                        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+                    )
+                )
+                created.append(name)
+            month = _add_months(month, 1)
+        return created
+
+    async def get_messages_partitions_before(self, cutoff: date, session: AsyncSession) -> list[str]:
+        """Return partitions that only hold messages sent before *cutoff*, oldest first."""
+        partitions = await self.get_messages_partitions(session)
+        return [name for month, name in sorted(partitions.items()) if _add_months(month, 1) <= cutoff]
+
+    async def delete_partition_documents(self, name: str, limit: int, session: AsyncSession) -> int:
+        """Delete up to *limit* documents of messages in partition *name*; returns how many were deleted."""
+        # documents.message_fk has no FK to the partitioned table, clean it up by hand
+        stmt = text(
+            "DELETE FROM documents WHERE id IN ("
+            f"SELECT documents.id FROM documents JOIN {name} ON documents.message_fk = {name}.id LIMIT :limit)"
+        )
+        result = cast(CursorResult, await session.execute(stmt, {"limit": limit}))
+        return result.rowcount
+
+    async def drop_messages_partition(self, name: str, lock_timeout_ms: int, session: AsyncSession) -> None:
+        """
+        Detach partition *name* and drop it. Delete its documents first, so the transaction stays short.
+
+        ``DETACH PARTITION ... CONCURRENTLY`` is refused while ``messages_default`` exists, and a
+        plain detach locks ``messages`` exclusively. Waiting for that lock stops at *lock_timeout_ms*,
+        so writes don't queue up behind it while a long query holds the table.
+        """
+        await session.execute(text(f"SET LOCAL lock_timeout = {int(lock_timeout_ms)}"))
+        await session.execute(text(f"ALTER TABLE messages DETACH PARTITION {name}"))
+        await session.execute(text(f"DROP TABLE {name}"))
@@ -1,13 +1,20 @@
 from __future__ import annotations
 
 from datetime import datetime
+from typing import Sequence
 
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
 
-from app.models.models import Summary
+from app.models.models import Summary, SummaryKindEnum
+from app.repositories.outgoing_messages import OutgoingMessagesRepository
 
 
 class SummariesRepository:
+    _outgoing_messages = OutgoingMessagesRepository()
+
     async def save_summary(
         self,
         chat_id: int,
@@ -25,4 +32,63 @@ class SummariesRepository:
         )
         session.add(summary)
         await session.flush()
+        # Same transaction: a saved digest is always delivered, see app/ai_analysis/delivery.py
+        await self._outgoing_messages.enqueue(
+            chat_id, content, session, summary_id=summary.id, scheduled_at=until
+        )
         return summary
+
+    async def save_partial_summary(
+        self,
+        chat_id: int,
+        content: str,
+        since: datetime,
+        until: datetime,
+        session: AsyncSession,
+    ) -> None:
+        """Store a partial summary unless another worker already stored one ending at *until*."""
+        stmt = (
+            insert(Summary)
+            .values(
+                chat_id=chat_id,
+                summary_content=content,
+                messages_since_time=since,
+                messages_until_time=until,
+                generated_at=datetime.utcnow(),
+                kind=SummaryKindEnum.PARTIAL.value,
+            )
+            .on_conflict_do_nothing(
+                index_elements=[Summary.chat_id, Summary.messages_until_time],
+                # Literal predicate, so Postgres can match it to the partial unique index
+                index_where=text(f"kind = '{SummaryKindEnum.PARTIAL.value}'"),
+            )
+        )
+        await session.execute(stmt)
+
+    async def get_partial_summaries_between(
+        self,
+        chat_id: int,
+        since: datetime,
+        until: datetime,
+        session: AsyncSession,
+    ) -> Sequence[Summary]:
+        stmt = (
+            select(Summary)
+            .where(
+                Summary.chat_id == chat_id,
+                Summary.kind == SummaryKindEnum.PARTIAL.value,  # type: ignore[arg-type]
+                Summary.messages_since_time >= since,
+                Summary.messages_until_time <= until,
+            )
+            .order_by(Summary.messages_until_time)
+        )
+        result = await session.execute(stmt)
+        return result.scalars().all()
+
+    async def get_last_partial_until(self, chat_id: int, session: AsyncSession) -> datetime | None:
+        stmt = select(func.max(Summary.messages_until_time)).where(
+            Summary.chat_id == chat_id,
+            Summary.kind == SummaryKindEnum.PARTIAL.value,  # type: ignore[arg-type]
+        )
+        result = await session.execute(stmt)
+        return result.scalar_one_or_none()
@@ -1,3 +1,5 @@
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.exc import IntegrityError
@@ -24,8 +26,48 @@ class UserRepository:
         )
         session.add(new_user)
         try:
-            await session.commit()
+            await session.flush()
             return new_user
         except IntegrityError:
             await session.rollback()
             raise ValueError("User with this Telegram ID already exists.")
+
+    async def get_or_create_user(self, session: AsyncSession, user_id: int,
+                                 username: str | None = None,
+                                 first_name: str | None = None,
+                                 last_name: str | None = None) -> User:
+        """Insert the user unless it exists (ON CONFLICT DO NOTHING) and return the stored row."""
+        now = datetime.utcnow()
+        stmt = (
+            insert(User)
+            .values(
+                id=user_id,
+                username=username,
+                first_name=first_name,
+                last_name=last_name,
+                bot_interaction_created_at=now,
+                created_at=now,
+            )
+            .on_conflict_do_nothing(index_elements=[User.id])
+            .returning(User)
+        )
+        result = await session.execute(stmt)
+        if user := result.scalars().first():
+            return user
+        # The row already existed; it is never deleted, so it must be there
+        result = await session.execute(select(User).where(User.id == user_id))
+        return result.scalar_one()
+
+    async def update_user_names(self, session: AsyncSession, user_id: int,
+                                username: str | None = None,
+                                first_name: str | None = None,
+                                last_name: str | None = None) -> User | None:
+        stmt = (
+            update(User)
+            .where(User.id == user_id)
+            .values(username=username, first_name=first_name, last_name=last_name)
+            .returning(User)
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.execute(stmt)
+        return result.scalars().first()
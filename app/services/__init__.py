@@ -1,5 +1,9 @@
+from app.ai_analysis.file_check import FileCheck
+from app.metrics import REGISTRY, MetricsServer
 from app.services.auth import AuthService
 from app.services.chats import ChatsService
+from app.services.ingestion import IngestionService
+from app.settings import get_settings
 
 __all__ = [
     "Services",
@@ -7,5 +11,22 @@ __all__ = [
 
 
 class Services:
-    auth = AuthService()
-    chats = ChatsService()
+    config = get_settings()
+
+    ingestion = IngestionService(
+        batch_size=config.INGEST_BATCH_SIZE,
+        flush_interval_sec=config.INGEST_FLUSH_INTERVAL_SEC,
+        queue_max_size=config.INGEST_QUEUE_MAX_SIZE,
+        flush_retries=config.INGEST_FLUSH_RETRIES,
+        flush_retry_backoff_sec=config.INGEST_FLUSH_RETRY_BACKOFF_SEC,
+    )
+    metrics = MetricsServer(REGISTRY, host=config.METRICS_HOST, port=config.METRICS_BOT_PORT)
+    auth = AuthService(
+        cache_max_size=config.AUTH_CACHE_MAX_SIZE,
+        cache_ttl_sec=config.AUTH_CACHE_TTL_SEC,
+    )
+    chats = ChatsService(
+        ingestion=ingestion,
+        default_timezone=config.TIMEZONE,
+        file_check=FileCheck.from_settings(config),
+    )
@@ -1,26 +1,40 @@
 from app.external_services.external_services import ExternalServices
 from app.models.models import User
 from app.repositories import Repositories
+from app.services.cache import LRUCache
 
 
 class AuthService:
+    def __init__(self, cache_max_size: int = 10000, cache_ttl_sec: float = 300):
+        # Recently seen users, so repeated updates from the same user cost no database round trips
+        self._users: LRUCache[int, User] = LRUCache(max_size=cache_max_size, ttl_sec=cache_ttl_sec)
+
     async def get_or_create_telegram_user(self, telegram_id: int,
                                           username: str | None = None,
                                           first_name: str | None = None,
                                           last_name: str | None = None
                                           ) -> User:
-        async with ExternalServices.database.session() as session:
-            if user := await Repositories.users.get_user_by_telegram_id(
-                user_id=telegram_id,
-                session=session
-            ):
-                return user
-            user = await Repositories.users.create_user(
-                user_id=telegram_id,
-                username=username,
-                first_name=first_name,
-                last_name=last_name,
-                session=session
-            )
-            await session.commit()
+        names = (username, first_name, last_name)
+        user = self._users.get(telegram_id)
+        if user is not None and (user.username, user.first_name, user.last_name) == names:
             return user
+
+        async with ExternalServices.database.session() as session:
+            if user is None:
+                user = await Repositories.users.get_or_create_user(
+                    user_id=telegram_id,
+                    username=username,
+                    first_name=first_name,
+                    last_name=last_name,
+                    session=session
+                )
+            if (user.username, user.first_name, user.last_name) != names:
+                user = await Repositories.users.update_user_names(
+                    user_id=telegram_id,
+                    username=username,
+                    first_name=first_name,
+                    last_name=last_name,
+                    session=session
+                ) or user
+        self._users.set(telegram_id, user)
+        return user
@@ -4,17 +4,31 @@ from datetime import time as time_type, datetime
 from typing import Optional
 
 from aiogram.enums import ContentType
-from aiogram.types import Message
+from aiogram.types import Document as TelegramDocument, Message
 
+from app.ai_analysis.file_check import FileCheck
 from app.models.models import Message as MessageModel
 from app.external_services.external_services import ExternalServices
+from app.metrics import Metrics
 from app.models.models import Chat, User
 from app.repositories import Repositories
+from app.services.ingestion import IngestionService, PendingDocument, PendingMessage
+from app.settings import get_settings
 
 
 class ChatsService:
+    def __init__(
+        self,
+        ingestion: IngestionService | None = None,
+        default_timezone: str = "UTC",
+        file_check: FileCheck | None = None,
+    ):
+        self._ingestion = ingestion or IngestionService()
+        self._default_timezone = default_timezone
+        self._file_check = file_check or FileCheck.from_settings(get_settings())
+
     async def get_admin_chats(self, admin_id: int) -> Sequence[Chat]:
-        async with ExternalServices.database.session() as session:
+        async with ExternalServices.database.session(autocommit=True) as session:
             chats = await Repositories.chats.get_admins_chats(
                 user_id=admin_id,
                 session=session
@@ -26,7 +40,8 @@ class ChatsService:
             await Repositories.chats.create_chat(
                 chat_id=chat_id,
                 title=chat_title,
-                session=session
+                session=session,
+                timezone=self._default_timezone,
             )
 
     async def add_admin(self, chat_id: int, user_id: int) -> None:
@@ -41,28 +56,68 @@ class ChatsService:
         self,
         message: Message
     ) -> MessageModel:
+        with Metrics.message_handle_seconds.time(mode="direct"):
+            new_message = await self._add_message(message)
+        Metrics.messages_ingested.inc(mode="direct")
+        return new_message
+
+    async def _add_message(self, message: Message) -> MessageModel:
         async with ExternalServices.database.session() as session:
             new_message = await Repositories.chats.add_message(
                 chat_id=message.chat.id,
                 user_id=message.from_user.id,
                 message_text=message.text,
                 message_type=message.content_type,
-                sent_at=datetime.now(),
+                sent_at=datetime.utcnow(),
                 session=session
             )
             if message.content_type is ContentType.DOCUMENT and message.document is not None:
                 if all([message.document.file_name, message.document.mime_type, message.document.file_size]):
                     await Repositories.chats.add_document(
                         message_id=new_message.id,
+                        chat_id=message.chat.id,
                         telegram_file_id=message.document.file_id,
+                        telegram_file_unique_id=message.document.file_unique_id,
                         file_name=message.document.file_name,  # type: ignore
                         file_type=message.document.mime_type,  # type: ignore
                         file_size=message.document.file_size,  # type: ignore
+                        processing_status=self._document_status(message.document),
                         session=session
                     )
-            await session.commit()
             return new_message
 
+    def _document_status(self, document: TelegramDocument) -> str:
+        """Documents refused by admission control are stored with their final status and never downloaded."""
+        return self._file_check.check(document.mime_type, document.file_size).value
+
+    async def enqueue_message(self, message: Message) -> None:
+        """Queue *message* for a batched insert instead of writing it right away."""
+        document = None
+        if message.content_type is ContentType.DOCUMENT and message.document is not None:
+            if all([message.document.file_name, message.document.mime_type, message.document.file_size]):
+                document = PendingDocument(
+                    telegram_file_id=message.document.file_id,
+                    telegram_file_unique_id=message.document.file_unique_id,
+                    file_name=message.document.file_name,  # type: ignore
+                    file_type=message.document.mime_type,  # type: ignore
+                    file_size=message.document.file_size,  # type: ignore
+                    processing_status=self._document_status(message.document),
+                )
+        with Metrics.message_handle_seconds.time(mode="batched"):
+            await self._ingestion.enqueue(
+                PendingMessage(
+                    chat_id=message.chat.id,
+                    user_id=message.from_user.id,
+                    message_text=message.text,
+                    message_type=message.content_type,
+                    sent_at=datetime.utcnow(),
+                    document=document,
+                )
+            )
+        Metrics.messages_ingested.inc(mode="batched")
+
     async def set_summary_time(self, chat_id: int, time: time_type) -> None:
         async with ExternalServices.database.session() as session:
-            await Repositories.chats.set_summary_time(chat_id, time, session=session)
+            await Repositories.chats.set_summary_time(
+                chat_id, time, session=session, timezone=self._default_timezone
+            )
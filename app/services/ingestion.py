@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Sequence
+
+import asyncpg  # type: ignore[import-untyped]
+from aiogram.enums import ContentType
+from sqlalchemy.exc import DBAPIError, InterfaceError, TimeoutError as PoolTimeoutError
+
+from app.external_services.external_services import ExternalServices
+from app.metrics import Metrics
+from app.repositories import Repositories
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class PendingDocument:
+    telegram_file_id: str
+    telegram_file_unique_id: str
+    file_name: str
+    file_type: str
+    file_size: int
+    processing_status: str
+
+
+@dataclass(slots=True)
+class PendingMessage:
+    chat_id: int
+    user_id: int
+    message_text: str | None
+    message_type: ContentType
+    sent_at: datetime
+    document: PendingDocument | None = None
+
+
+_STOP = object()
+
+_CONNECTION_ERRORS = (
+    OSError,  # includes timeouts and refused connections
+    PoolTimeoutError,
+    InterfaceError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.CannotConnectNowError,
+    asyncpg.InterfaceError,
+)
+
+
+def _is_connection_error(exc: BaseException | None) -> bool:
+    """Whether *exc*, or an error it was raised from, means the database can't be reached rather than a bad row"""
+    while exc is not None:
+        if isinstance(exc, _CONNECTION_ERRORS):
+            return True
+        if isinstance(exc, DBAPIError) and exc.connection_invalidated:
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+class IngestionService:
+    """
+    Buffers incoming chat messages and writes them to the database in batches.
+
+    A batch is flushed when it reaches ``batch_size`` rows or when ``flush_interval_sec``
+    passes since its first row, whichever comes first. The queue is bounded, so producers
+    wait in :meth:`enqueue` when the database can't keep up.
+    While the database can't be reached a write is retried ``flush_retries`` times with
+    exponential backoff; a batch rejected for its data is written row by row instead.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 500,
+        flush_interval_sec: float = 1.0,
+        queue_max_size: int = 10000,
+        flush_retries: int = 3,
+        flush_retry_backoff_sec: float = 0.5,
+    ):
+        self._batch_size = batch_size
+        self._flush_interval_sec = flush_interval_sec
+        self._flush_retries = flush_retries
+        self._flush_retry_backoff_sec = flush_retry_backoff_sec
+        # Not bound to an event loop until first used, so it can be created here
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_max_size)
+        self._worker: asyncio.Task | None = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    async def start(self) -> None:
+        if self.is_running:
+            return
+        self._worker = asyncio.create_task(self._run())
+        Metrics.ingest_queue_depth.set_function(self._queue.qsize)
+
+    async def stop(self) -> None:
+        """Flush everything that is still queued and stop the worker."""
+        worker = self._worker
+        if worker is None or worker.done():
+            return
+        await self._queue.put(_STOP)
+        await worker
+        self._worker = None
+
+    async def enqueue(self, message: PendingMessage) -> None:
+        if not self.is_running:
+            # Not started (e.g. one-off scripts): write through immediately
+            await self._flush([message])
+            return
+        await self._queue.put(message)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = loop.time() + self._flush_interval_sec
+            while len(batch) < self._batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+        # Messages enqueued while stopping are written before the worker exits
+        leftovers = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not _STOP:
+                leftovers.append(item)
+        if leftovers:
+            await self._flush(leftovers)
+
+    async def _flush(self, batch: Sequence[PendingMessage]) -> None:
+        try:
+            with Metrics.ingest_flush_seconds.time():
+                await self._write_with_retries(batch)
+            Metrics.ingest_batch_size.observe(len(batch))
+            return
+        except Exception as exc:  # pylint: disable=broad-except
+            if len(batch) == 1 or _is_connection_error(exc):
+                logger.exception("Failed to store %s messages: %s", len(batch), exc)
+                Metrics.ingest_failed_messages.inc(len(batch))
+                return
+            # One bad row (e.g. unknown chat) must not drop the whole batch
+            logger.warning("Batch insert of %s messages failed, retrying one by one: %s", len(batch), exc)
+        for index, message in enumerate(batch):
+            try:
+                await self._write_with_retries([message])
+            except Exception as exc:  # pylint: disable=broad-except
+                if _is_connection_error(exc):
+                    logger.exception("Failed to store the last %s messages of a batch: %s", len(batch) - index, exc)
+                    Metrics.ingest_failed_messages.inc(len(batch) - index)
+                    return
+                logger.exception("Failed to store message from chat %s: %s", message.chat_id, exc)
+                Metrics.ingest_failed_messages.inc()
+
+    async def _write_with_retries(self, batch: Sequence[PendingMessage]) -> None:
+        for attempt in range(self._flush_retries + 1):
+            try:
+                await self._write(batch)
+                return
+            except Exception as exc:  # pylint: disable=broad-except
+                if attempt == self._flush_retries or not _is_connection_error(exc):
+                    raise
+                delay = self._flush_retry_backoff_sec * 2 ** attempt
+                logger.warning("Writing %s messages failed, retrying in %.1fs: %s", len(batch), delay, exc)
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    async def _write(batch: Sequence[PendingMessage]) -> None:
+        async with ExternalServices.database.session() as session:
+            message_ids = await Repositories.chats.add_messages(
+                [
+                    {
+                        "chat_id": message.chat_id,
+                        "sender_user_id": message.user_id,
+                        "message_text": message.message_text,
+                        "message_type": message.message_type,
+                        "sent_at": message.sent_at,
+                    }
+                    for message in batch
+                ],
+                session=session,
+            )
+            await Repositories.chats.add_documents(
+                [
+                    {
+                        "message_fk": message_id,
+                        "chat_id": message.chat_id,
+                        "telegram_file_id": message.document.telegram_file_id,
+                        "telegram_file_unique_id": message.document.telegram_file_unique_id,
+                        "file_name": message.document.file_name,
+                        "file_type": message.document.file_type,
+                        "file_size_bytes": message.document.file_size,
+                        "processing_status": message.document.processing_status,
+                    }
+                    for message, message_id in zip(batch, message_ids)
+                    if message.document is not None
+                ],
+                session=session,
+            )
@@ -1,8 +1,19 @@
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
     BOT_TOKEN: str = ""
+    BOT_MODE: str = "polling"  # "polling" or "webhook"
+    WEBHOOK_URL: str = ""  # public HTTPS URL of the load balancer; empty leaves the registered webhook as is
+    WEBHOOK_PATH: str = "/webhook"
+    WEBHOOK_SECRET: str = ""  # required in webhook mode, checked against X-Telegram-Bot-Api-Secret-Token
+    WEBHOOK_HOST: str = "0.0.0.0"
+    WEBHOOK_PORT: int = 8080
+    WEBHOOK_MAX_CONNECTIONS: int = 40  # connections Telegram opens to the webhook URL, 1-100
+    WEBHOOK_MAX_CONCURRENT_UPDATES: int = 100  # updates handled at once by one replica
+    WEBHOOK_DRAIN_TIMEOUT_SEC: float = 25
     POSTGRES_USER: str = "postgres"
     POSTGRES_PASSWORD: str = "postgres"
     POSTGRES_DB: str = "telegram_bot"
@@ -11,7 +22,28 @@ class Settings(BaseSettings):
     POSTGRES_ECHO_POOL: bool = False
     POSTGRES_POOL_SIZE: int = 10
     POSTGRES_CONNECTION_RETRY_PERIOD_SEC: int = 5
+    POSTGRES_MAX_OVERFLOW: int = 10
+    POSTGRES_POOL_RECYCLE_SEC: int = 1800
+    POSTGRES_POOL_TIMEOUT_SEC: float = 30
+    POSTGRES_POOL_PRE_PING: bool = False  # one extra round trip per checkout
+    POSTGRES_STATEMENT_TIMEOUT_MS: int = 0  # 0 disables; applies to every query, maintenance included
+
+    FSM_STORAGE: str = "postgres"  # "postgres" (shared by all bot replicas) or "memory"
+    FSM_STATE_TTL_SEC: int = 24 * 60 * 60  # abandoned conversations are forgotten after this
+    FSM_CLEANUP_INTERVAL_SEC: float = 300  # 0 disables deleting expired conversations
+    FSM_CLEANUP_BATCH_SIZE: int = 1000
+
+    AUTH_CACHE_MAX_SIZE: int = 10000
+    AUTH_CACHE_TTL_SEC: float = 300
+
+    INGEST_BATCH_SIZE: int = 500
+    INGEST_FLUSH_INTERVAL_SEC: float = 1.0
+    INGEST_QUEUE_MAX_SIZE: int = 10000
+    INGEST_FLUSH_RETRIES: int = 3  # retries of a write while the database can't be reached
+    INGEST_FLUSH_RETRY_BACKOFF_SEC: float = 0.5
 
+    MESSAGES_PARTITIONS_AHEAD_MONTHS: int = 2
+    MESSAGES_RETENTION_MONTHS: int = 0  # 0 keeps the whole history
 
     @property
     def POSTGRES_URL(self) -> str:
@@ -26,9 +58,61 @@ class Settings(BaseSettings):
     OPENAI_API_ENDPOINT: str = "https://api.openai.com/v1"
     OPENAI_API_KEY: str = ""
     OPENAI_MODEL: str = "gpt-3.5-turbo"
+    OPENAI_MODEL_CONTEXT_TOKENS: int = 0  # 0 looks the context size up by OPENAI_MODEL
+    OPENAI_REQUESTS_PER_MINUTE: int = 500  # shared by every AI workload of the process, 0 is unlimited
+    OPENAI_TOKENS_PER_MINUTE: int = 0  # estimated prompt + completion tokens, 0 is unlimited
+    OPENAI_MAX_CONNECTIONS: int = 100
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    OPENAI_KEEPALIVE_EXPIRY_SEC: float = 30
+    OPENAI_CONNECT_TIMEOUT_SEC: float = 5
+    OPENAI_TIMEOUT_SEC: float = 60  # per attempt
+    OPENAI_MAX_RETRIES: int = 4  # on 429, 5xx and connection errors
+    LLM_BACKEND: str = "openai"  # "openai" (any OpenAI-compatible endpoint) or "stub" (in-process, no network)
+    LLM_STUB_LATENCY_SEC: float = 0.2
+    LLM_STUB_ERROR_RATE: float = 0.0
+    LLM_STUB_TOKENS_PER_SEC: float = 0  # completion throughput, 0 answers right after the latency
+    TELEGRAM_MESSAGES_PER_SECOND: float = 25  # whole bot, Telegram allows about 30
+    TELEGRAM_CHAT_MESSAGES_PER_MINUTE: float = 20  # per group chat; private chats get one per second
+    TELEGRAM_SEND_ATTEMPTS: int = 3  # in place, before the message is left to a later outbox attempt
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_MAX_ATTEMPTS: int = 10  # before a message is given up
+    OUTBOX_RETRY_BASE_DELAY_SEC: float = 30  # doubled on every attempt
+    OUTBOX_LEASE_SEC: int = 300
+    OUTBOX_POLL_INTERVAL_SEC: float = 10  # new messages are picked up at once through LISTEN/NOTIFY
+    SUMMARY_CONCURRENCY: int = 20
+    SUMMARY_MAP_CONCURRENCY: int = 4
+    SUMMARY_CHUNK_MAX_TOKENS: int = 500
+    SUMMARY_INCREMENTAL: bool = False  # condense messages into partial summaries during the day
+    SUMMARY_PARTIAL_INTERVAL_SEC: int = 3600
+    SUMMARY_CLAIM_BATCH_SIZE: int = 500
+    SUMMARY_LEASE_SEC: int = 900
+    SUMMARY_MAX_ATTEMPTS: int = 3  # a digest that fails this many times is skipped until the next one
+    SUMMARY_SCHEDULER_MAX_SLEEP_SEC: float = 60.0
+    DOCUMENT_POLL_INTERVAL_SEC: float = 5.0
+    DOCUMENT_NOTIFY_FALLBACK_POLL_SEC: float = 60.0  # poll interval while LISTEN is active
+    DOCUMENT_QUEUE_SIZE: int = 16
+    DOCUMENT_DOWNLOAD_WORKERS: int = 4
+    DOCUMENT_EXTRACT_PROCESSES: int = 2
+    DOCUMENT_SUMMARIZE_WORKERS: int = 4
+    DOCUMENT_WORKER_ID: str = ""  # defaults to <hostname>:<pid>
+    DOCUMENT_LEASE_SEC: int = 900
+    DOCUMENT_MAX_ATTEMPTS: int = 3
+    DOCUMENT_SUMMARY_CACHE_SIZE: int = 1000
+    DOCUMENT_SPOOL_DIR: str = ""  # temporary files for downloads, system default when empty
+    DOCUMENT_MAX_PAGES: int = 200
+    DOCUMENT_MAX_CHARS: int = 200_000
+    DOCUMENT_MAX_FILE_SIZE_BYTES: int = 20 * 1024 * 1024  # Bot API download limit
+    DOCUMENT_ALLOWED_FILE_TYPES: list[str] = []  # mime types; empty allows every type with an extractor
+    DOCUMENT_CHAT_DAILY_QUOTA: int = 0  # documents summarized per chat in 24 hours, 0 is unlimited
+    METRICS_HOST: str = "0.0.0.0"
+    METRICS_BOT_PORT: int = 9101  # 0 disables the endpoint
+    METRICS_DAEMON_PORT: int = 9102  # 0 disables the endpoint
+    METRICS_COLLECT_INTERVAL_SEC: float = 15
     DEFAULT_SUMMARY_TIME: str = "20:00"
     TIMEZONE: str = "UTC"
 
 
+@lru_cache
 def get_settings(env_file: str = ".env") -> Settings:
+    """Settings are read from the environment and *env_file* once per process."""
     return Settings(_env_file=env_file)
@@ -0,0 +1,4 @@
+"""
+Benchmarks of the ingestion, digest and document pipelines, run through the real code paths
+against a local PostgreSQL with a stubbed LLM and Telegram. See ``python -m benchmarks --help``.
+"""
@@ -0,0 +1,88 @@
+"""
+Run the benchmarks and print their results as JSON.
+
+    alembic upgrade head
+    python -m benchmarks all --output bench.json
+
+Needs a migrated PostgreSQL configured with the usual POSTGRES_* settings; use a dedicated
+database, since run_once also picks up due chats and queued documents that aren't the
+benchmark's own. Completions are answered by the stub LLM backend and Telegram by an
+in-memory fake, so no network access is needed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+from datetime import datetime, timezone
+
+# Before any app module reads the settings
+os.environ.setdefault("LLM_BACKEND", "stub")
+os.environ.setdefault("LLM_STUB_LATENCY_SEC", "0.05")
+
+BENCHMARKS = ("ingestion", "digest", "documents")
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Pipeline benchmarks, JSON output")
+    parser.add_argument("benchmark", nargs="?", default="all", choices=(*BENCHMARKS, "all"))
+    parser.add_argument("--output", help="write the results to this file instead of stdout")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--messages", type=int, default=5000, help="ingestion: messages to store")
+    parser.add_argument("--concurrency", type=int, default=100, help="ingestion: concurrent handlers")
+    parser.add_argument("--ingestion-mode", choices=("direct", "batched", "both"), default="both")
+    parser.add_argument("--chats", type=int, default=50, help="chats the traffic and digests are spread over")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--messages-per-chat", type=int, default=200, help="digest: messages in each chat")
+    parser.add_argument("--documents", type=int, default=30)
+    parser.add_argument("--pages", type=int, default=20, help="documents: pages of each generated PDF")
+    return parser.parse_args()
+
+
+async def _run(args: argparse.Namespace) -> dict:
+    from app.external_services.external_services import ExternalServices
+    from benchmarks import digest, documents, ingestion
+
+    selected = BENCHMARKS if args.benchmark == "all" else (args.benchmark,)
+    results: dict = {}
+    try:
+        if "ingestion" in selected:
+            modes = ("direct", "batched") if args.ingestion_mode == "both" else (args.ingestion_mode,)
+            results["ingestion"] = [
+                await ingestion.run(args.messages, args.chats, args.users, args.concurrency, mode, args.seed)
+                for mode in modes
+            ]
+        if "digest" in selected:
+            results["digest"] = await digest.run(args.chats, args.messages_per_chat, args.users, args.seed)
+        if "documents" in selected:
+            results["documents"] = await documents.run(args.documents, args.pages, args.chats, args.seed)
+    finally:
+        await ExternalServices.stop()
+    return results
+
+
+def main() -> None:
+    args = _parse_args()
+    started_at = datetime.now(timezone.utc)
+    results = asyncio.run(_run(args))
+    report = {
+        "started_at": started_at.isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "llm_backend": os.environ["LLM_BACKEND"],
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
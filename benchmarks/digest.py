@@ -0,0 +1,77 @@
+"""Daily digests of many chats due at the same moment, through DailySummaryGenerator.run_once and the outbox."""
+
+from __future__ import annotations
+
+import random
+import time
+from datetime import datetime, timedelta
+
+from aiogram.enums import ContentType
+
+from app.ai_analysis.daily_summary import DailySummaryGenerator
+from app.ai_analysis.delivery import DeliveryWorker
+from app.ai_analysis.telegram_sender import TelegramSender
+from app.settings import get_settings
+from benchmarks.harness import (
+    FakeBot,
+    chat_ids,
+    create_fixtures,
+    insert_messages,
+    measure,
+    percentiles,
+    remove_fixtures,
+    user_ids,
+)
+from benchmarks.ingestion import WORDS
+
+
+async def run(chats: int, messages_per_chat: int, users: int, seed: int = 0) -> dict:
+    """
+    Make *chats* digests due at once, each over *messages_per_chat* messages of the last day.
+    Latency of a chat is the time from the start of run_once to the last part of its digest
+    being sent by the delivery worker, which drains the outbox after generation.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    due_at = now - timedelta(minutes=1)
+    bench_chats, bench_users = chat_ids(chats), user_ids(users)
+    await create_fixtures(bench_chats, bench_users, next_summary_at=due_at)
+    rows = [
+        {
+            "chat_id": chat_id,
+            "sender_user_id": rng.choice(bench_users),
+            "message_text": " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 30))),
+            "message_type": ContentType.TEXT,
+            "sent_at": due_at - timedelta(seconds=rng.randint(60, 23 * 60 * 60)),
+        }
+        for chat_id in bench_chats
+        for _ in range(messages_per_chat)
+    ]
+    for start in range(0, len(rows), 5000):
+        await insert_messages(rows[start:start + 5000])
+
+    bot = FakeBot()
+    generator = DailySummaryGenerator()
+    cfg = get_settings()
+    delivery_worker = DeliveryWorker.from_settings(TelegramSender.from_settings(bot, cfg), cfg)  # type: ignore[arg-type]
+    try:
+        with measure() as measurement:
+            started = time.perf_counter()
+            claimed = await generator.run_once(now)
+            while await delivery_worker.deliver_once():
+                pass
+    finally:
+        await remove_fixtures(bench_chats, bench_users)
+
+    # Long digests are split into several messages; a digest is delivered with its last part
+    delivered_at = {chat_id: sent_at for (chat_id, _text), sent_at in zip(bot.sent, bot.sent_times)}
+    return {
+        "params": {"chats": chats, "messages_per_chat": messages_per_chat, "users": users},
+        "chats_claimed": claimed,
+        "digests_sent": len(delivered_at),
+        "messages_sent": len(bot.sent),
+        "digests_per_sec": round(len(delivered_at) / measurement.elapsed_sec, 2),
+        "digest_latency_ms": percentiles([sent_at - started for sent_at in delivered_at.values()]),
+        "round_trips_per_chat": round(measurement.round_trips.total / max(claimed, 1), 3),
+        **measurement.as_dict(),
+    }
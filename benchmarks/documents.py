@@ -0,0 +1,110 @@
+"""Document summarization of generated PDFs through DocumentProcessor.run_once."""
+
+from __future__ import annotations
+
+import hashlib
+import random
+from collections import Counter
+from datetime import datetime
+
+import fitz
+from aiogram.enums import ContentType
+from sqlalchemy import func, select
+
+from app.ai_analysis.document_processor import DocumentProcessor
+from app.external_services.external_services import ExternalServices
+from app.models.models import AnalysisProcessingStatusEnum, Document
+from app.repositories import Repositories
+from benchmarks.harness import (
+    FakeBot,
+    chat_ids,
+    create_fixtures,
+    insert_messages,
+    measure,
+    remove_fixtures,
+    user_ids,
+)
+from benchmarks.ingestion import WORDS
+
+UNFINISHED_STATUSES = [AnalysisProcessingStatusEnum.NOT_STARTED.value, AnalysisProcessingStatusEnum.PENDING.value]
+
+
+def make_pdf(pages: int, rng: random.Random) -> bytes:
+    with fitz.open() as doc:
+        for _ in range(pages):
+            page = doc.new_page()
+            text = " ".join(rng.choice(WORDS) for _ in range(400))
+            page.insert_textbox(page.rect + (50, 50, -50, -50), text)
+        return doc.tobytes()
+
+
+async def _status_counts(chats: list[int]) -> Counter:
+    async with ExternalServices.database.session(autocommit=True) as session:
+        result = await session.execute(
+            select(Document.processing_status, func.count())
+            .where(Document.chat_id.in_(chats))
+            .group_by(Document.processing_status)
+        )
+        return Counter(dict(result.tuples().all()))
+
+
+async def run(documents: int, pages: int, chats: int, seed: int = 0) -> dict:
+    """Summarize *documents* distinct PDFs of *pages* pages each with the stub LLM."""
+    rng = random.Random(seed)
+    bench_chats, bench_users = chat_ids(chats), user_ids(1)
+    await create_fixtures(bench_chats, bench_users, next_summary_at=datetime.utcnow().replace(year=2100))
+
+    bot = FakeBot()
+    now = datetime.utcnow()
+    message_chats = [bench_chats[index % chats] for index in range(documents)]
+    message_ids = await insert_messages(
+        [
+            {"chat_id": chat_id, "sender_user_id": bench_users[0], "message_text": None,
+             "message_type": ContentType.DOCUMENT, "sent_at": now}
+            for chat_id in message_chats
+        ]
+    )
+    rows = []
+    for index, (chat_id, message_id) in enumerate(zip(message_chats, message_ids)):
+        file_id = f"bench-file-{seed}-{index}"
+        bot.files[file_id] = make_pdf(pages, rng)
+        rows.append(
+            {
+                "message_fk": message_id,
+                "chat_id": chat_id,
+                "telegram_file_id": file_id,
+                "telegram_file_unique_id": file_id,
+                "file_name": f"{file_id}.pdf",
+                "file_type": "application/pdf",
+                "file_size_bytes": len(bot.files[file_id]),
+            }
+        )
+    async with ExternalServices.database.session() as session:
+        await Repositories.chats.add_documents(rows, session)
+    cache_keys = [f"file:{file_id}" for file_id in bot.files]
+    cache_keys += [f"sha256:{hashlib.sha256(data).hexdigest()}" for data in bot.files.values()]
+
+    processor = DocumentProcessor(bot)  # type: ignore[arg-type]
+    runs = 0
+    try:
+        with measure() as measurement:
+            # Each run handles one batch; stop once every benchmark document is finished
+            while runs < documents:
+                await processor.run_once()
+                runs += 1
+                with measurement.round_trips.paused():
+                    statuses = await _status_counts(bench_chats)
+                if not sum(statuses[status] for status in UNFINISHED_STATUSES):
+                    break
+    finally:
+        processor.close()
+        await remove_fixtures(bench_chats, bench_users, cache_keys)
+
+    return {
+        "params": {"documents": documents, "pages": pages, "chats": chats, "batch_size": processor.BATCH_SIZE},
+        "batches": runs,
+        "statuses": dict(statuses),
+        "documents_per_sec": round(documents / measurement.elapsed_sec, 2),
+        "round_trips_per_document": round(measurement.round_trips.total / documents, 3),
+        **measurement.as_dict(),
+    }
@@ -0,0 +1,203 @@
+"""Measurement helpers, a stand-in Telegram bot and fixtures shared by the benchmarks."""
+
+from __future__ import annotations
+
+import math
+import resource
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Iterator, Sequence
+
+from sqlalchemy import delete, event
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.external_services.external_services import ExternalServices
+from app.models.models import (
+    Chat,
+    ChatAdmin,
+    ChatSettings,
+    Document,
+    DocumentSummaryCache,
+    Message,
+    OutgoingMessage,
+    Summary,
+    User,
+)
+from app.repositories import Repositories
+
+# Benchmark rows live in ID ranges real Telegram chats and users don't use, and are removed afterwards
+CHAT_ID_BASE = -990_000_000_000
+USER_ID_BASE = 990_000_000_000
+
+
+class RoundTripCounter:
+    """Counts statements, BEGINs, COMMITs and ROLLBACKs the engine sends to the database."""
+
+    EVENTS = ("before_cursor_execute", "begin", "commit", "rollback")
+
+    def __init__(self, engine: AsyncEngine):
+        self._engine = engine.sync_engine
+        self.counts = dict.fromkeys(self.EVENTS, 0)
+        self._paused = False
+
+    def _listener(self, name: str):
+        def count(*_args, **_kwargs):
+            if not self._paused:
+                self.counts[name] += 1
+
+        return count
+
+    def __enter__(self) -> RoundTripCounter:
+        self._listeners = {name: self._listener(name) for name in self.EVENTS}
+        for name, listener in self._listeners.items():
+            event.listen(self._engine, name, listener)
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        for name, listener in self._listeners.items():
+            event.remove(self._engine, name, listener)
+
+    @contextmanager
+    def paused(self) -> Iterator[None]:
+        """Bookkeeping queries of the benchmark itself are not counted."""
+        self._paused = True
+        try:
+            yield
+        finally:
+            self._paused = False
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def as_dict(self) -> dict[str, int]:
+        return {
+            "statements": self.counts["before_cursor_execute"],
+            "transactions": self.counts["begin"],
+            "total": self.total,
+        }
+
+
+@dataclass
+class Measurement:
+    round_trips: RoundTripCounter
+    elapsed_sec: float = 0.0
+    peak_traced_bytes: int = 0
+    max_rss_kb: int = 0
+    max_children_rss_kb: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "elapsed_sec": round(self.elapsed_sec, 4),
+            "round_trips": self.round_trips.as_dict(),
+            "peak_memory": {
+                "traced_python_bytes": self.peak_traced_bytes,
+                "max_rss_kb": self.max_rss_kb,
+                "max_children_rss_kb": self.max_children_rss_kb,
+            },
+        }
+
+
+@contextmanager
+def measure() -> Iterator[Measurement]:
+    """Wall time, database round trips and peak memory of the enclosed block."""
+    with RoundTripCounter(ExternalServices.database.engine) as counter:
+        measurement = Measurement(round_trips=counter)
+        tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            yield measurement
+        finally:
+            measurement.elapsed_sec = time.perf_counter() - started
+            _current, measurement.peak_traced_bytes = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            measurement.max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            measurement.max_children_rss_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+
+def percentiles(values: Sequence[float], points: Sequence[int] = (50, 90, 95, 99)) -> dict[str, float]:
+    """Nearest-rank percentiles, in milliseconds when *values* are seconds."""
+    if not values:
+        return {}
+    ordered = sorted(values)
+    result = {f"p{point}": round(ordered[max(math.ceil(point / 100 * len(ordered)) - 1, 0)] * 1000, 3) for point in points}
+    result["max"] = round(ordered[-1] * 1000, 3)
+    result["mean"] = round(sum(ordered) / len(ordered) * 1000, 3)
+    return result
+
+
+@dataclass
+class FakeBot:
+    """Stands in for aiogram's Bot: records sent messages and serves files from memory."""
+
+    files: dict[str, bytes] = field(default_factory=dict)
+    sent: list[tuple[int, str]] = field(default_factory=list)
+    sent_times: list[float] = field(default_factory=list)  # time.perf_counter() of every send
+
+    async def send_message(self, chat_id: int, text: str, **_kwargs) -> SimpleNamespace:
+        self.sent.append((chat_id, text))
+        self.sent_times.append(time.perf_counter())
+        return SimpleNamespace(chat=SimpleNamespace(id=chat_id), text=text)
+
+    async def get_file(self, file_id: str) -> SimpleNamespace:
+        return SimpleNamespace(file_id=file_id, file_path=file_id)
+
+    async def download_file(self, file_path: str, destination: str) -> None:
+        with open(destination, "wb") as file:
+            file.write(self.files[file_path])
+
+
+def chat_ids(count: int) -> list[int]:
+    return [CHAT_ID_BASE - index for index in range(count)]
+
+
+def user_ids(count: int) -> list[int]:
+    return [USER_ID_BASE + index for index in range(count)]
+
+
+async def create_fixtures(chats: Sequence[int], users: Sequence[int], next_summary_at: datetime) -> None:
+    async with ExternalServices.database.session() as session:
+        await session.execute(
+            pg_insert(User).on_conflict_do_nothing(),
+            [{"id": user_id, "first_name": f"Bench {user_id}"} for user_id in users],
+        )
+        await session.execute(
+            pg_insert(Chat).on_conflict_do_nothing(),
+            [{"id": chat_id, "chat_title": f"Bench {chat_id}"} for chat_id in chats],
+        )
+        await session.execute(
+            pg_insert(ChatSettings).on_conflict_do_nothing(),
+            [
+                {
+                    "chat_id": chat_id,
+                    "summary_time": next_summary_at.time(),
+                    "timezone": "UTC",
+                    "next_summary_at": next_summary_at,
+                }
+                for chat_id in chats
+            ],
+        )
+
+
+async def insert_messages(rows: Sequence[dict[str, Any]]) -> list[int]:
+    async with ExternalServices.database.session() as session:
+        return await Repositories.chats.add_messages(rows, session)
+
+
+async def remove_fixtures(chats: Sequence[int], users: Sequence[int], cache_keys: Sequence[str] = ()) -> None:
+    async with ExternalServices.database.session() as session:
+        await session.execute(delete(Document).where(Document.chat_id.in_(chats)))
+        await session.execute(delete(OutgoingMessage).where(OutgoingMessage.chat_id.in_(chats)))
+        await session.execute(delete(Summary).where(Summary.chat_id.in_(chats)))
+        await session.execute(delete(Message).where(Message.chat_id.in_(chats)))
+        await session.execute(delete(ChatSettings).where(ChatSettings.chat_id.in_(chats)))
+        await session.execute(delete(ChatAdmin).where(ChatAdmin.chat_id.in_(chats)))
+        await session.execute(delete(Chat).where(Chat.id.in_(chats)))
+        await session.execute(delete(User).where(User.id.in_(users)))
+        if cache_keys:
+            await session.execute(delete(DocumentSummaryCache).where(DocumentSummaryCache.cache_key.in_(cache_keys)))
@@ -0,0 +1,75 @@
+"""Message ingestion through ChatsService under synthetic group traffic."""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from datetime import datetime
+
+from aiogram.types import Chat, Message, User
+
+from app.services.chats import ChatsService
+from app.services.ingestion import IngestionService
+from benchmarks.harness import chat_ids, create_fixtures, measure, percentiles, remove_fixtures, user_ids
+
+WORDS = ("meeting", "release", "deploy", "lunch", "bug", "review", "tomorrow", "done", "thanks", "why", "ok", "plan")
+
+
+def _make_messages(count: int, chats: list[int], users: list[int], rng: random.Random) -> list[Message]:
+    now = datetime.now()
+    return [
+        Message(
+            message_id=index,
+            date=now,
+            chat=Chat(id=rng.choice(chats), type="supergroup", title="Bench"),
+            from_user=User(id=rng.choice(users), is_bot=False, first_name="Bench"),
+            text=" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 30))),
+        )
+        for index in range(count)
+    ]
+
+
+async def run(messages: int, chats: int, users: int, concurrency: int, mode: str, seed: int = 0) -> dict:
+    """
+    Store *messages* spread over *chats* with *concurrency* handlers at a time.
+    *mode* is ``direct`` (ChatsService.add_message, one transaction per message) or
+    ``batched`` (ChatsService.enqueue_message through IngestionService).
+    """
+    rng = random.Random(seed)
+    bench_chats, bench_users = chat_ids(chats), user_ids(users)
+    await create_fixtures(bench_chats, bench_users, next_summary_at=datetime.utcnow().replace(year=2100))
+    traffic = _make_messages(messages, bench_chats, bench_users, rng)
+
+    ingestion = IngestionService()
+    service = ChatsService(ingestion=ingestion)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def handle(message: Message) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            if mode == "direct":
+                await service.add_message(message)
+            else:
+                await service.enqueue_message(message)
+            latencies.append(time.perf_counter() - started)
+
+    try:
+        with measure() as measurement:
+            if mode == "batched":
+                await ingestion.start()
+            await asyncio.gather(*(handle(message) for message in traffic))
+            if mode == "batched":
+                # Included in the measurement: messages only count once they are stored
+                await ingestion.stop()
+    finally:
+        await remove_fixtures(bench_chats, bench_users)
+
+    return {
+        "params": {"messages": messages, "chats": chats, "users": users, "concurrency": concurrency, "mode": mode},
+        "messages_per_sec": round(messages / measurement.elapsed_sec, 2),
+        "handler_latency_ms": percentiles(latencies),
+        "round_trips_per_message": round(measurement.round_trips.total / messages, 3),
+        **measurement.as_dict(),
+    }